@@ -0,0 +1,120 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first
+PRIORITY_OWNER = 0
+PRIORITY_SESSION = 1  # the chat already has a call going
+PRIORITY_NORMAL = 2
+PRIORITY_IMPORT = 3  # playlist import lookups: bulk work, after every interactive request
+
+
+class AdmissionRejected(Exception):
+    """The request was shed: the wait queue is full or it waited too long."""
+
+
+class AdmissionController:
+    """Global and per-chat concurrency limits with a bounded priority wait queue.
+
+    Up to ``max_active`` requests run at once, at most ``max_per_chat`` of
+    them from one chat. The rest wait in priority order (then arrival
+    order), and no more than ``max_waiting`` may wait. When the queue is
+    full, a newcomer displaces the newest waiter of a lower priority or is
+    rejected. A waiter is also rejected after ``max_wait`` seconds, so
+    the tail latency under overload is bounded by design.
+    """
+
+    def __init__(self, max_active=32, max_per_chat=2, max_waiting=128, max_wait=15):
+        self.max_active = max_active
+        self.max_per_chat = max_per_chat
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.active = 0
+        self._per_chat = {}
+        self._waiting = []  # heap of [priority, seq, chat_id, future]
+        self._seq = itertools.count()
+        self.stats = {"admitted": 0, "queued": 0, "shed": 0, "timed_out": 0}
+
+    @property
+    def waiting(self):
+        return len(self._waiting)
+
+    def _can_run(self, chat_id):
+        return self.active < self.max_active and self._per_chat.get(chat_id, 0) < self.max_per_chat
+
+    def _start(self, chat_id):
+        self.active += 1
+        self._per_chat[chat_id] = self._per_chat.get(chat_id, 0) + 1
+        self.stats["admitted"] += 1
+
+    def _discard(self, entry):
+        if entry in self._waiting:
+            self._waiting.remove(entry)
+            heapq.heapify(self._waiting)
+
+    def _release(self, chat_id):
+        self.active -= 1
+        count = self._per_chat.get(chat_id, 1) - 1
+        if count:
+            self._per_chat[chat_id] = count
+        else:
+            self._per_chat.pop(chat_id, None)
+        self._grant()
+
+    def _grant(self):
+        # Best waiter first, skipping chats that are at their own limit
+        for entry in sorted(self._waiting):
+            if self.active >= self.max_active:
+                return
+            chat_id, future = entry[2], entry[3]
+            if future.done():
+                self._discard(entry)
+            elif self._can_run(chat_id):
+                self._discard(entry)
+                self._start(chat_id)
+                future.set_result(None)
+
+    async def _acquire(self, chat_id, priority):
+        # Waiters are only left queued when they cannot run (global or own per-chat limit),
+        # so a newcomer that fits does not jump ahead of anyone who could use the slot
+        if self._can_run(chat_id):
+            self._start(chat_id)
+            return
+        if len(self._waiting) >= self.max_waiting:
+            worst = max(self._waiting)
+            if worst[0] <= priority:
+                self.stats["shed"] += 1
+                raise AdmissionRejected("wait queue full")
+            self._discard(worst)
+            self.stats["shed"] += 1
+            worst[3].set_exception(AdmissionRejected("displaced by a higher-priority request"))
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._seq), chat_id, future]
+        heapq.heappush(self._waiting, entry)
+        self.stats["queued"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self._release(chat_id)  # granted just as we gave up: hand the slot on
+            else:
+                self._discard(entry)
+                if not future.done():
+                    future.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                self.stats["timed_out"] += 1
+                raise AdmissionRejected("waited too long") from None
+            raise
+
+    @asynccontextmanager
+    async def slot(self, chat_id, priority=PRIORITY_NORMAL):
+        await self._acquire(chat_id, priority)
+        try:
+            yield
+        finally:
+            self._release(chat_id)
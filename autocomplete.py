@@ -0,0 +1,112 @@
+import math
+from collections import Counter, OrderedDict
+
+from track_index import index_key
+
+
+def _grams(key, partial_last=False):
+    """Trigrams of every word padded as ``"  word "``; the last one unterminated if still being typed."""
+    words = key.split()
+    grams = set()
+    for i, word in enumerate(words):
+        padded = f"  {word}" if partial_last and i == len(words) - 1 else f"  {word} "
+        grams.update(padded[j:j + 3] for j in range(len(padded) - 2))
+    return grams
+
+
+class SuggestIndex:
+    """Prefix/trigram index over the titles of tracks we have already resolved.
+
+    Title words are indexed as trigrams of ``"  word "``, so the leading
+    grams double as one- and two-letter prefixes and a half-typed last word
+    still matches. A search intersects the posting sets of the query's
+    grams, rarest first. If that finds fewer than ``limit`` tracks, it adds
+    titles sharing at least ``min_similarity`` of the grams, which catches
+    typos. Results rank by how many query words start a title word, then
+    by play count, then by shorter title. At most ``max_entries`` tracks
+    are kept, least recently added first out.
+    """
+
+    def __init__(self, max_entries=20000, min_similarity=0.5):
+        self.max_entries = max_entries
+        self.min_similarity = min_similarity
+        self._tracks = OrderedDict()  # video id -> (title, duration, index key)
+        self._postings = {}           # gram -> set of video ids
+        self._plays = {}              # video id -> times played
+        self.stats = {"hits": 0, "misses": 0}
+
+    def __len__(self):
+        return len(self._tracks)
+
+    # ✅ Updates
+    def add(self, video_id, title, duration=0, plays=None):
+        if plays is not None:
+            self._plays[video_id] = plays
+        if video_id in self._tracks:
+            self._tracks.move_to_end(video_id)
+            return
+        key = index_key(title or "")
+        if not video_id or not key:
+            return
+        self._tracks[video_id] = (title, duration or 0, key)
+        for gram in _grams(key):
+            self._postings.setdefault(gram, set()).add(video_id)
+        if len(self._tracks) > self.max_entries:
+            self._remove(next(iter(self._tracks)))
+
+    def _remove(self, video_id):
+        _, _, key = self._tracks.pop(video_id)
+        self._plays.pop(video_id, None)
+        for gram in _grams(key):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(video_id)
+                if not ids:
+                    del self._postings[gram]
+
+    # ✅ Lookups
+    def _track(self, video_id):
+        title, duration, _ = self._tracks[video_id]
+        return {"id": video_id, "title": title, "duration": duration}
+
+    def get(self, video_id):
+        return self._track(video_id) if video_id in self._tracks else None
+
+    def top(self, limit=50):
+        ranked = sorted((video_id for video_id in self._plays if video_id in self._tracks),
+                        key=lambda video_id: self._plays[video_id], reverse=True)
+        return [self._track(video_id) for video_id in ranked[:limit]]
+
+    def search(self, query, limit=50):
+        """Best ``limit`` tracks for a partly typed ``query``; the most played ones if it is empty."""
+        key = index_key(query)
+        if not key:
+            return self.top(limit)
+        grams = _grams(key, partial_last=True)
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        candidates = set(postings[0]).intersection(*postings[1:]) if postings[0] else set()
+        if len(candidates) < limit:
+            shared = Counter()
+            for ids in postings:
+                shared.update(ids)
+            needed = math.ceil(len(grams) * self.min_similarity)
+            candidates.update(video_id for video_id, count in shared.items() if count >= needed)
+        if not candidates:
+            self.stats["misses"] += 1
+            return []
+        self.stats["hits"] += 1
+
+        words = key.split()
+
+        def rank(video_id):
+            title_key = self._tracks[video_id][2]
+            title_words = title_key.split()
+            matched = sum(any(word.startswith(q) for word in title_words) for q in words)
+            return (
+                -(matched + title_key.startswith(key)),
+                -self._plays.get(video_id, 0),
+                len(title_key),
+                title_key,
+            )
+
+        return [self._track(video_id) for video_id in sorted(candidates, key=rank)[:limit]]
@@ -0,0 +1,420 @@
+"""Offline stand-ins for Pyrogram, PyTgCalls, yt-dlp, config and Spotify.
+
+``install()`` registers the fake modules in ``sys.modules`` so ``import main``
+works without network access or credentials. Every fake that would talk to
+the outside world sleeps for a configurable ``Latency`` instead.
+"""
+import asyncio
+import random
+import sys
+import time
+import types
+
+
+class Latency:
+    """Latency model in seconds: ``base`` plus uniform ``jitter``."""
+
+    def __init__(self, base=0.0, jitter=0.0):
+        self.base = base
+        self.jitter = jitter
+
+    def sample(self):
+        return self.base + random.uniform(0, self.jitter) if self.jitter else self.base
+
+    async def wait(self):
+        delay = self.sample()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+LATENCY = {
+    "telegram": Latency(0.02, 0.02),     # Bot API round trip
+    "tgcalls": Latency(0.05, 0.05),      # join/change/leave
+    "ytdlp": Latency(0.4, 0.3),          # extract_info wall time (blocking, in a worker)
+    "ytdlp_cpu": Latency(0.0),           # extra busy-loop CPU per extraction
+    "spotify": Latency(0.08, 0.05),      # search round trip
+}
+
+COUNTERS = {"ytdlp_calls": 0, "spotify_calls": 0, "telegram_calls": 0, "tgcalls_calls": 0}
+
+
+# ✅ Pyrogram
+class _Filter:
+    def __init__(self, name="filter"):
+        self.name = name
+
+    def __and__(self, other):
+        return _Filter(f"({self.name} & {other.name})")
+
+    def __or__(self, other):
+        return _Filter(f"({self.name} | {other.name})")
+
+    def __invert__(self):
+        return _Filter(f"~{self.name}")
+
+
+def _filter_factory(name):
+    def factory(*args, **kwargs):
+        return _Filter(name)
+    return factory
+
+
+class _Filters(types.ModuleType):
+    group = _Filter("group")
+    private = _Filter("private")
+    text = _Filter("text")
+    command = staticmethod(_filter_factory("command"))
+    regex = staticmethod(_filter_factory("regex"))
+    user = staticmethod(_filter_factory("user"))
+    chat = staticmethod(_filter_factory("chat"))
+
+
+class _Decorators:
+    """Any ``on_*`` attribute is a decorator factory that records and returns the handler."""
+
+    def __getattr__(self, name):
+        if not name.startswith("on_"):
+            raise AttributeError(name)
+
+        def factory(*args, **kwargs):
+            def decorator(func):
+                self.handlers.setdefault(name, []).append(func)
+                return func
+            return decorator
+        return factory
+
+
+class FakeChatMember:
+    def __init__(self, status="administrator"):
+        self.status = status
+
+
+class FakeClient(_Decorators):
+    member_status = "administrator"
+
+    def __init__(self, *args, **kwargs):
+        self.handlers = {}
+        self.is_connected = False
+        self.sent = 0
+
+    async def start(self):
+        self.is_connected = True
+
+    async def stop(self):
+        self.is_connected = False
+
+    async def _api(self):
+        COUNTERS["telegram_calls"] += 1
+        await LATENCY["telegram"].wait()
+
+    async def get_chat_member(self, chat_id, user_id):
+        await self._api()
+        return FakeChatMember(self.member_status)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await self._api()
+        return FakeMessage(self, FakeChat(chat_id), FakeUser(0), text)
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        await self._api()
+        return FakeMessage(self, FakeChat(chat_id), FakeUser(0), kwargs.get("caption", ""))
+
+    async def send_document(self, chat_id, document, **kwargs):
+        await self._api()
+
+    async def copy_message(self, chat_id, from_chat_id, message_id, **kwargs):
+        await self._api()
+
+    async def edit_message_text(self, chat_id, message_id, text, **kwargs):
+        await self._api()
+
+    async def edit_message_caption(self, chat_id, message_id, caption, **kwargs):
+        await self._api()
+
+    async def edit_message_media(self, chat_id, message_id, media, **kwargs):
+        await self._api()
+        return FakeMessage(self, FakeChat(chat_id), FakeUser(0), getattr(media, "caption", ""))
+
+    async def delete_messages(self, chat_id, message_ids, **kwargs):
+        await self._api()
+
+
+class FakeChat:
+    def __init__(self, chat_id, chat_type="supergroup"):
+        self.id = chat_id
+        self.type = chat_type
+
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+
+
+class FakePhoto:
+    def __init__(self, file_id):
+        self.file_id = file_id
+
+
+_message_ids = iter(range(1, 10 ** 12))
+
+
+class FakeMessage:
+    def __init__(self, client, chat, from_user, text=""):
+        self._client = client
+        self.chat = chat
+        self.from_user = from_user
+        self.text = text
+        self.caption = text
+        self.message_id = next(_message_ids)
+        self.id = self.message_id
+        self.command = text.lstrip("./").split() if text else []
+        self.photo = FakePhoto(f"photo-{self.message_id}")
+
+    async def reply_text(self, text, **kwargs):
+        await self._client._api()
+        return FakeMessage(self._client, self.chat, FakeUser(0), text)
+
+    async def reply_photo(self, photo, caption="", **kwargs):
+        await self._client._api()
+        return FakeMessage(self._client, self.chat, FakeUser(0), caption)
+
+    async def edit(self, text, **kwargs):
+        await self._client._api()
+        self.text = text
+        return self
+
+    edit_text = edit
+
+    async def edit_caption(self, caption, **kwargs):
+        await self._client._api()
+        self.caption = caption
+        return self
+
+    async def delete(self):
+        await self._client._api()
+
+
+class FakeCallbackQuery:
+    def __init__(self, client, message, from_user, data):
+        self._client = client
+        self.message = message
+        self.from_user = from_user
+        self.data = data
+
+    async def answer(self, text=None, show_alert=False):
+        await self._client._api()
+
+    async def edit_message_text(self, text, **kwargs):
+        await self._client._api()
+
+
+class _InlineKeyboardMarkup:
+    def __init__(self, inline_keyboard):
+        self.inline_keyboard = inline_keyboard
+
+
+class _InlineKeyboardButton:
+    def __init__(self, text, callback_data=None, url=None, **kwargs):
+        self.text = text
+        self.callback_data = callback_data
+        self.url = url
+
+
+class _Simple:
+    def __init__(self, *args, **kwargs):
+        self.args = args
+        self.__dict__.update(kwargs)
+
+
+class FloodWait(Exception):
+    def __init__(self, value=1):
+        super().__init__(f"FloodWait {value}s")
+        self.value = value
+        self.x = value
+
+
+# Errors meaning the bot can no longer post in a chat
+PERMANENT_ERRORS = {
+    name: type(name, (Exception,), {})
+    for name in ("UserIsBlocked", "InputUserDeactivated", "PeerIdInvalid", "ChatIdInvalid",
+                 "ChannelPrivate", "ChatWriteForbidden")
+}
+
+
+async def _idle():
+    await asyncio.Event().wait()
+
+
+# ✅ PyTgCalls
+class FakePyTgCalls(_Decorators):
+    def __init__(self, client, *args, **kwargs):
+        self.handlers = {}
+        self.active = {}
+        self.started = False
+
+    async def start(self):
+        self.started = True
+
+    async def _call(self):
+        COUNTERS["tgcalls_calls"] += 1
+        await LATENCY["tgcalls"].wait()
+
+    async def join_group_call(self, chat_id, stream, **kwargs):
+        await self._call()
+        self.active[chat_id] = stream
+
+    async def change_stream(self, chat_id, stream):
+        await self._call()
+        self.active[chat_id] = stream
+
+    async def leave_group_call(self, chat_id):
+        await self._call()
+        self.active.pop(chat_id, None)
+
+    async def pause_stream(self, chat_id):
+        await self._call()
+
+    async def resume_stream(self, chat_id):
+        await self._call()
+
+    async def end_stream(self, chat_id):
+        """Simulate PyTgCalls reporting that the current track finished."""
+        update = _Simple(chat_id=chat_id)
+        for handler in self.handlers.get("on_stream_end", []):
+            await handler(self, update)
+
+
+class _StreamType:
+    @property
+    def pulse_stream(self):
+        return "pulse"
+
+
+class _AudioPiped:
+    def __init__(self, path, *args, **kwargs):
+        self.path = path
+
+
+# ✅ yt-dlp
+class DownloadError(Exception):
+    pass
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class FakeYoutubeDL:
+    def __init__(self, opts=None):
+        self.opts = opts or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def get_info_extractor(self, name):
+        return None
+
+    @staticmethod
+    def _video(seed):
+        video_id = f"v{abs(hash(seed)) % 10 ** 10:010d}"
+        expire = int(time.time()) + 6 * 3600
+        return {
+            "id": video_id,
+            "title": f"Track {seed}",
+            "duration": 180,
+            "url": f"https://stand-in.googlevideo.invalid/{video_id}?expire={expire}",
+            "webpage_url": f"https://www.youtube.com/watch?v={video_id}",
+        }
+
+    def extract_info(self, target, download=False):
+        COUNTERS["ytdlp_calls"] += 1
+        time.sleep(LATENCY["ytdlp"].sample())
+        _busy(LATENCY["ytdlp_cpu"].sample())
+        if target.startswith("ytsearch:"):
+            return {"entries": [self._video(target[len("ytsearch:"):])]}
+        return self._video(target.rsplit("=", 1)[-1])
+
+    def sanitize_info(self, info):
+        return info
+
+
+# ✅ Spotify
+class FakeSpotify:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def search_tracks(self, query, limit=1):
+        COUNTERS["spotify_calls"] += 1
+        await LATENCY["spotify"].wait()
+        return [{
+            "id": f"sp{abs(hash(query)) % 10 ** 8:08d}",
+            "name": query.title(),
+            "artists": [{"name": "Stand-in Artist"}],
+            "external_urls": {"spotify": "https://open.spotify.com/track/stand-in"},
+        }]
+
+    async def get_tracks(self, track_ids):
+        await LATENCY["spotify"].wait()
+        return []
+
+    async def iter_collection(self, kind, collection_id, max_tracks=None, size=120, page_size=50):
+        """A ``size``-track collection in ``page_size`` pages; every 10th track repeats an earlier one."""
+        total = min(size, max_tracks or size)
+        for offset in range(0, total, page_size):
+            COUNTERS["spotify_calls"] += 1
+            await LATENCY["spotify"].wait()
+            yield [{
+                "id": f"{collection_id}-{i - 5 if i % 10 == 9 else i}",
+                "name": f"{collection_id} Song {i - 5 if i % 10 == 9 else i}",
+                "artists": [{"name": "Stand-in Artist"}],
+                "external_urls": {"spotify": "https://open.spotify.com/track/stand-in"},
+            } for i in range(offset, min(offset + page_size, total))]
+
+    async def close(self):
+        pass
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+
+def install(owner_id=1):
+    """Register every stand-in module; call before ``import main``."""
+    pyrogram = _module("pyrogram", Client=FakeClient, idle=_idle)
+    filters = _Filters("pyrogram.filters")
+    sys.modules["pyrogram.filters"] = filters
+    pyrogram.filters = filters
+    pyrogram.types = _module(
+        "pyrogram.types",
+        Message=FakeMessage,
+        CallbackQuery=FakeCallbackQuery,
+        InlineKeyboardMarkup=_InlineKeyboardMarkup,
+        InlineKeyboardButton=_InlineKeyboardButton,
+        InlineQuery=_Simple,
+        InlineQueryResultArticle=_Simple,
+        InputTextMessageContent=_Simple,
+        InputMediaPhoto=_Simple,
+        ChatMemberUpdated=_Simple,
+    )
+    pyrogram.errors = _module("pyrogram.errors", FloodWait=FloodWait, RPCError=Exception, **PERMANENT_ERRORS)
+
+    pytgcalls = _module("pytgcalls", PyTgCalls=FakePyTgCalls)
+    pytgcalls.types = _module("pytgcalls.types", StreamType=_StreamType)
+    pytgcalls.types.input_stream = _module("pytgcalls.types.input_stream", AudioPiped=_AudioPiped)
+
+    yt_dlp = _module("yt_dlp", YoutubeDL=FakeYoutubeDL)
+    yt_dlp.utils = _module("yt_dlp.utils", DownloadError=DownloadError)
+
+    _module(
+        "config",
+        API_ID=0, API_HASH="", BOT_TOKEN="", OWNER_ID=owner_id,
+        SPOTIFY_CLIENT_ID="stand-in", SPOTIFY_CLIENT_SECRET="stand-in",
+    )
@@ -0,0 +1,254 @@
+"""Offline load benchmark for the /play pipeline.
+
+Drives the real handlers in ``main`` (play_rola_command, stop, the player
+control callbacks and stream-end auto-advance) against the stand-ins in
+``bench.fakes``, with synthetic traffic: many chats, Zipf-skewed song
+popularity and bursts of simultaneous commands.
+
+    python -m bench.play_bench --chats 200 --ops 2000
+    python -m bench.play_bench --save-baseline bench/baseline.json
+    python -m bench.play_bench --compare bench/baseline.json
+
+Runs in a scratch directory, so queue/cache files never touch the repo.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from bench import fakes
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+OP_MIX = {"play": 0.75, "skip": 0.08, "pause": 0.03, "resume": 0.03, "stop": 0.04, "stream_end": 0.07}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def zipf_weights(n, s):
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def load_main(args):
+    workdir = tempfile.mkdtemp(prefix="rola-bench-")
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+    os.environ.setdefault("ROLA_EXTRACTOR_MODE", "thread")
+    os.environ.setdefault("ROLA_EXTRACTOR_WORKERS", str(args.workers))
+    os.environ.setdefault("ROLA_EXTRACTOR_MAX_PENDING", "100000")
+    fakes.install(owner_id=args.owner_id)
+    import main
+    return main, workdir
+
+
+class LoopLagMonitor:
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - started - self.interval))
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        self._task.cancel()
+
+
+async def run(args):
+    main, workdir = load_main(args)
+    client = main.app
+    main.sp = fakes.FakeSpotify()
+    chats = [-(1000000000000 + i) for i in range(args.chats)]
+    await main.load_queue()
+    await main.load_admin_commands()
+    main.allowed_admin_commands.update({"play", "stop", "pause", "resume", "skip"})
+    for chat_id in chats:
+        main.allowed_groups[chat_id] = True
+    main.track_store.threshold = 10 ** 9  # no ffmpeg in the benchmark
+    await main.extractor.start()
+
+    songs = [f"song {i}" for i in range(args.songs)]
+    weights = zipf_weights(args.songs, args.zipf)
+    op_names, op_weights = zip(*OP_MIX.items())
+    latencies = {name: [] for name in op_names}
+    errors = {}
+    user = fakes.FakeUser(args.owner_id + 1)
+
+    # Pre-generate the workload with its own RNG so runs with the same seed replay the same traffic
+    rng = random.Random(args.seed)
+    workload = []
+    for _ in range(args.ops):
+        op = rng.choices(op_names, op_weights)[0]
+        song = rng.choices(songs, weights)[0] if op == "play" else None
+        workload.append((op, rng.choice(chats), song))
+
+    async def one_op(op, chat_id, song):
+        chat = fakes.FakeChat(chat_id)
+        started = time.perf_counter()
+        try:
+            if op == "play":
+                message = fakes.FakeMessage(client, chat, user, f".play {song}")
+                await main.play_rola_command(client, message)
+            elif op == "stop":
+                await main.stop(client, fakes.FakeMessage(client, chat, user, ".stop"))
+            elif op == "stream_end":
+                await main.call_py.end_stream(chat_id)
+            else:
+                message = fakes.FakeMessage(client, chat, fakes.FakeUser(0), "")
+                query = fakes.FakeCallbackQuery(client, message, user, op)
+                await main.playback_control_callback(client, query)
+        except Exception as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+        latencies[op].append(time.perf_counter() - started)
+
+    monitor = LoopLagMonitor()
+    if args.trace_memory:
+        tracemalloc.start()
+    monitor.start()
+    started = time.perf_counter()
+    pending = []
+    issued = 0
+    while issued < args.ops:
+        burst = workload[issued:issued + args.burst]
+        pending.extend(asyncio.ensure_future(one_op(*entry)) for entry in burst)
+        issued += len(burst)
+        await asyncio.sleep(args.burst_gap)
+    await asyncio.gather(*pending)
+    elapsed = time.perf_counter() - started
+    monitor.stop()
+    peak_bytes = tracemalloc.get_traced_memory()[1] if args.trace_memory else 0
+    tracemalloc.stop()
+    main.extractor.shutdown()
+
+    all_latencies = [v for values in latencies.values() for v in values]
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("save_baseline", "compare")},
+        "ops": len(all_latencies),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_ops_s": round(len(all_latencies) / elapsed, 2),
+        "latency_ms": {
+            name: {
+                "count": len(values),
+                "p50": round(percentile(values, 50) * 1000, 2),
+                "p95": round(percentile(values, 95) * 1000, 2),
+                "p99": round(percentile(values, 99) * 1000, 2),
+            }
+            for name, values in list(latencies.items()) + [("all", all_latencies)]
+        },
+        "loop_lag_ms": {
+            "p50": round(percentile(monitor.samples, 50) * 1000, 2),
+            "p99": round(percentile(monitor.samples, 99) * 1000, 2),
+            "max": round(max(monitor.samples, default=0) * 1000, 2),
+        },
+        "memory": {
+            "traced_peak_mb": round(peak_bytes / 1024 / 1024, 2) if args.trace_memory else None,
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+        },
+        "upstream_calls": dict(fakes.COUNTERS),
+        "stage_seconds": stage_summary(main),
+        "errors": errors,
+    }
+    print(f"Scratch directory: {workdir}", file=sys.stderr)
+    return report
+
+
+def stage_summary(main):
+    """Mean time per pipeline stage, read from the bot's own metrics."""
+    from metrics import STAGE_SECONDS
+    summary = {}
+    for (stage_name,), values in STAGE_SECONDS._series.items():
+        count, total = values[-1], values[-2]
+        summary[stage_name] = {"count": count, "mean_ms": round(total / count * 1000, 2) if count else 0}
+    return summary
+
+
+def compare(report, baseline, tolerance):
+    """Return the list of metrics that regressed by more than ``tolerance`` (fraction)."""
+    regressions = []
+    for name in ("p50", "p95", "p99"):
+        old = baseline["latency_ms"]["all"][name]
+        new = report["latency_ms"]["all"][name]
+        if old and new > old * (1 + tolerance):
+            regressions.append(f"latency {name}: {old} ms -> {new} ms")
+    old_tp, new_tp = baseline["throughput_ops_s"], report["throughput_ops_s"]
+    if new_tp < old_tp * (1 - tolerance):
+        regressions.append(f"throughput: {old_tp} -> {new_tp} ops/s")
+    old_lag, new_lag = baseline["loop_lag_ms"]["p99"], report["loop_lag_ms"]["p99"]
+    # Loop lag is noisy at the millisecond level; ignore small absolute changes
+    if old_lag and new_lag > old_lag * (1 + tolerance) and new_lag - old_lag > 20:
+        regressions.append(f"loop lag p99: {old_lag} ms -> {new_lag} ms")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--songs", type=int, default=500)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of song popularity")
+    parser.add_argument("--burst", type=int, default=25, help="commands fired at once")
+    parser.add_argument("--burst-gap", type=float, default=0.5, help="seconds between bursts")
+    parser.add_argument("--workers", type=int, default=8, help="extraction workers")
+    parser.add_argument("--ytdlp-latency", type=float, default=None, help="override yt-dlp base latency (s)")
+    parser.add_argument("--spotify-latency", type=float, default=None)
+    parser.add_argument("--telegram-latency", type=float, default=None)
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="track Python allocations with tracemalloc (slows the run down)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--owner-id", type=int, default=1)
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed regression (fraction)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    random.seed(args.seed)
+    for key, value in (("ytdlp", args.ytdlp_latency), ("spotify", args.spotify_latency),
+                       ("telegram", args.telegram_latency)):
+        if value is not None:
+            fakes.LATENCY[key].base = value
+    # Baseline paths are relative to where the command was run, not the scratch dir
+    save_path = os.path.abspath(args.save_baseline) if args.save_baseline else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+
+    if save_path:
+        with open(save_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Baseline saved to {save_path}")
+    if compare_path:
+        with open(compare_path) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("❌ Regressions against baseline:\n  " + "\n  ".join(regressions))
+            return 1
+        print("✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Check ``AsyncSpotify`` against a local aiohttp stand-in for the Web API.
+
+Starts a throwaway server on 127.0.0.1 that issues short-lived tokens,
+answers the first ``/tracks`` call with a 429 + ``Retry-After`` and serves
+track batches, then drives the real client through it:
+
+    python -m bench.spotify_check
+
+Checks that the token is refreshed before it expires (and after a 401),
+that a 429 is retried after the server's ``Retry-After`` and that
+``get_tracks`` splits IDs into batches of at most 50, keeping their order.
+Exits non-zero if any check fails.
+"""
+import asyncio
+import sys
+import time
+
+from aiohttp import web
+
+from spotify_client import TRACKS_BATCH_SIZE, AsyncSpotify
+
+RETRY_AFTER = 0.2
+TOKEN_TTL = 2  # seconds; the client is given refresh_margin=1
+
+
+class StandIn:
+    def __init__(self):
+        self.tokens_issued = 0
+        self.valid_tokens = set()
+        self.batches = []
+        self.rate_limited = 0
+        self.rejected = 0
+        self.limit_next = True
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/token", self.token)
+        app.router.add_get("/v1/tracks", self.tracks)
+        return app
+
+    async def token(self, request):
+        form = await request.post()
+        if form.get("grant_type") != "client_credentials" or not request.headers.get("Authorization", "").startswith("Basic "):
+            return web.json_response({"error": "invalid_client", "error_description": "bad credentials"}, status=400)
+        self.tokens_issued += 1
+        token = f"token-{self.tokens_issued}"
+        self.valid_tokens.add(token)
+        return web.json_response({"access_token": token, "token_type": "Bearer", "expires_in": TOKEN_TTL})
+
+    async def tracks(self, request):
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if token not in self.valid_tokens:
+            self.rejected += 1
+            return web.json_response({"error": {"status": 401, "message": "Invalid access token"}}, status=401)
+        if self.limit_next:
+            self.limit_next = False
+            self.rate_limited += 1
+            return web.json_response({"error": {"status": 429, "message": "API rate limit exceeded"}},
+                                     status=429, headers={"Retry-After": str(RETRY_AFTER)})
+        ids = request.query["ids"].split(",")
+        self.batches.append(len(ids))
+        return web.json_response({"tracks": [{"id": track_id, "name": f"Track {track_id}"} for track_id in ids]})
+
+
+async def run():
+    stand_in = StandIn()
+    runner = web.AppRunner(stand_in.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base = f"http://127.0.0.1:{port}"
+    client = AsyncSpotify("id", "secret", api_base=f"{base}/v1", token_url=f"{base}/token", refresh_margin=1)
+    failures = []
+
+    def check(ok, message):
+        print(f"{'✅' if ok else '❌'} {message}")
+        if not ok:
+            failures.append(message)
+
+    try:
+        # 429 + Retry-After, then batching
+        ids = [f"t{i:03d}" for i in range(2 * TRACKS_BATCH_SIZE + 7)]
+        started = time.monotonic()
+        tracks = await client.get_tracks(ids)
+        elapsed = time.monotonic() - started
+        check(stand_in.rate_limited == 1 and elapsed >= RETRY_AFTER,
+              f"429 retried after Retry-After ({elapsed:.2f}s >= {RETRY_AFTER}s)")
+        check(sorted(stand_in.batches) == [7, TRACKS_BATCH_SIZE, TRACKS_BATCH_SIZE],
+              f"get_tracks batched {len(ids)} IDs as {sorted(stand_in.batches)}")
+        check([track["id"] for track in tracks] == ids, "get_tracks kept the ID order")
+        check(stand_in.tokens_issued == 1, f"one token shared by parallel batches ({stand_in.tokens_issued} issued)")
+
+        # Token refresh inside refresh_margin of expiry
+        await client.get_tracks(ids[:1])
+        check(stand_in.tokens_issued == 1, "token reused while still fresh")
+        await asyncio.sleep(TOKEN_TTL - 1 + 0.1)
+        await client.get_tracks(ids[:1])
+        check(stand_in.tokens_issued == 2 and stand_in.rejected == 0,
+              f"token refreshed before expiry ({stand_in.tokens_issued} issued, {stand_in.rejected} rejected)")
+
+        # Token revoked early: the 401 triggers a new one
+        stand_in.valid_tokens.clear()
+        await client.get_tracks(ids[:1])
+        check(stand_in.tokens_issued == 3 and stand_in.rejected == 1,
+              f"401 fetched a new token ({stand_in.tokens_issued} issued, {stand_in.rejected} rejected)")
+    finally:
+        await client.close()
+        await runner.cleanup()
+    return failures
+
+
+def main():
+    failures = asyncio.run(run())
+    if failures:
+        print(f"❌ {len(failures)} check(s) failed")
+        return 1
+    print("✅ AsyncSpotify checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+import aiofiles
+from pyrogram.errors import (
+    FloodWait, UserIsBlocked, InputUserDeactivated, PeerIdInvalid, ChatIdInvalid, ChannelPrivate, ChatWriteForbidden
+)
+
+logger = logging.getLogger(__name__)
+
+# The bot was blocked, removed or muted there, or the chat is gone: retrying cannot help
+CHAT_GONE_ERRORS = (
+    UserIsBlocked, InputUserDeactivated, PeerIdInvalid, ChatIdInvalid, ChannelPrivate, ChatWriteForbidden
+)
+
+
+class ChatDirectory:
+    """Every chat the bot has seen, persisted in batches; the broadcast audience."""
+
+    def __init__(self, path="chats.json"):
+        self.path = path
+        self.chat_ids = set()
+        self._dirty = False
+
+    def add(self, chat_id):
+        if chat_id not in self.chat_ids:
+            self.chat_ids.add(chat_id)
+            self._dirty = True
+
+    def discard(self, chat_id):
+        if chat_id in self.chat_ids:
+            self.chat_ids.discard(chat_id)
+            self._dirty = True
+
+    async def load(self):
+        try:
+            async with aiofiles.open(self.path, "r") as f:
+                self.chat_ids = set(json.loads(await f.read() or "[]"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.chat_ids = set()
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        self._dirty = False
+        tmp_path = f"{self.path}.tmp"
+        try:
+            async with aiofiles.open(tmp_path, "w") as f:
+                await f.write(json.dumps(sorted(self.chat_ids)))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self._dirty = True
+            logger.error(f"❌ Chat Directory Save Error: {e}")
+
+    async def run_flusher(self, interval=60):
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    async def take(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class BroadcastEngine:
+    """Copies one message to many chats with bounded concurrency and a global rate limit.
+
+    A FloodWait pauses every worker for the requested time and the chat is
+    retried, never dropped; other errors are retried up to ``max_retries``
+    times before the chat counts as failed. A chat the bot can no longer
+    post in fails at once and is passed to ``on_chat_gone``. Progress is checkpointed to ``state_path`` as a
+    low-water mark (every chat before it is done) plus the few finished
+    chats past it, so an interrupted broadcast resumes where it stopped.
+    Only chats whose send was in flight at the last checkpoint can get the
+    message twice.
+    """
+
+    def __init__(self, client, state_path="broadcast_state.json", rate=25, concurrency=20,
+                 checkpoint_every=200, progress_interval=5, max_retries=2, on_chat_gone=None):
+        self.client = client
+        self.state_path = state_path
+        self.rate = rate
+        self.concurrency = concurrency
+        self.checkpoint_every = checkpoint_every
+        self.progress_interval = progress_interval
+        self.max_retries = max_retries
+        self.on_chat_gone = on_chat_gone
+        self.state = None
+        self._task = None
+        self._paused_until = 0
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    # ✅ Checkpoints
+    async def _save_state(self, done=()):
+        self.state["done"] = sorted(done)
+        tmp_path = f"{self.state_path}.tmp"
+        async with aiofiles.open(tmp_path, "w") as f:
+            await f.write(json.dumps(self.state))
+        os.replace(tmp_path, self.state_path)
+
+    async def load_unfinished(self):
+        try:
+            async with aiofiles.open(self.state_path, "r") as f:
+                state = json.loads(await f.read() or "null")
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if state and state["cursor"] < len(state["chat_ids"]):
+            return state
+        return None
+
+    # ✅ Public API
+    def start(self, from_chat_id, message_id, chat_ids, on_progress=None):
+        if self.running:
+            raise RuntimeError("A broadcast is already running")
+        self.state = {
+            "from_chat_id": from_chat_id,
+            "message_id": message_id,
+            "chat_ids": list(chat_ids),
+            "cursor": 0,
+            "sent": 0,
+            "failed": 0,
+            "done": [],
+            "started_at": time.time(),
+        }
+        self._task = asyncio.ensure_future(self._run(on_progress))
+        return self._task
+
+    def resume(self, state, on_progress=None):
+        if self.running:
+            raise RuntimeError("A broadcast is already running")
+        self.state = state
+        self._task = asyncio.ensure_future(self._run(on_progress))
+        return self._task
+
+    async def stop(self, discard=False):
+        """Stop the running broadcast; with ``discard`` it will not be resumed later."""
+        stopped = self.running
+        if stopped:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if discard:
+            try:
+                os.remove(self.state_path)
+            except FileNotFoundError:
+                pass
+        return stopped
+
+    # ✅ Workers
+    async def _send(self, chat_id, bucket):
+        errors = 0
+        while True:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            await bucket.take()
+            if self._paused_until > time.monotonic():
+                continue  # a FloodWait started while we waited for the token
+            try:
+                await self.client.copy_message(chat_id, self.state["from_chat_id"], self.state["message_id"])
+                return True
+            except CHAT_GONE_ERRORS as e:
+                logger.info(f"Broadcast to {chat_id} failed for good, dropping the chat: {e}")
+                if self.on_chat_gone:
+                    self.on_chat_gone(chat_id)
+                return False
+            except FloodWait as e:
+                wait = getattr(e, "value", None) or getattr(e, "x", 1)
+                logger.warning(f"⚠️ Broadcast FloodWait: pausing {wait}s")
+                self._paused_until = max(self._paused_until, time.monotonic() + wait + 1)
+            except Exception as e:
+                errors += 1
+                if errors > self.max_retries:
+                    logger.info(f"Broadcast to {chat_id} failed: {e}")
+                    return False
+
+    async def _run(self, on_progress):
+        state = self.state
+        chat_ids = state["chat_ids"]
+        total = len(chat_ids)
+        bucket = TokenBucket(self.rate, self.rate)
+        next_index = state["cursor"]
+        done = set(state.get("done", ()))
+        last_checkpoint = state["cursor"]
+        last_progress = 0
+
+        async def worker():
+            nonlocal next_index, last_checkpoint, last_progress
+            while next_index < total:
+                index = next_index
+                next_index += 1
+                if index in done:
+                    continue
+                if await self._send(chat_ids[index], bucket):
+                    state["sent"] += 1
+                else:
+                    state["failed"] += 1
+                done.add(index)
+                # Advance the low-water mark over every finished index
+                while state["cursor"] in done:
+                    done.discard(state["cursor"])
+                    state["cursor"] += 1
+                if state["cursor"] - last_checkpoint >= self.checkpoint_every:
+                    last_checkpoint = state["cursor"]
+                    await self._save_state(done)
+                if on_progress and time.monotonic() - last_progress >= self.progress_interval:
+                    last_progress = time.monotonic()
+                    await self._report(on_progress, total, finished=False)
+
+        try:
+            await self._save_state(done)
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, max(1, total)))))
+        finally:
+            await self._save_state(done)
+        if on_progress:
+            await self._report(on_progress, total, finished=True)
+        return state
+
+    async def _report(self, on_progress, total, finished):
+        try:
+            await on_progress(self.state["sent"], self.state["failed"], total, finished)
+        except Exception as e:
+            logger.warning(f"⚠️ Broadcast progress update failed: {e}")
@@ -0,0 +1,214 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+import aiofiles
+
+logger = logging.getLogger(__name__)
+
+
+class TwoTierCache:
+    """Memory LRU (entry + byte budget) in front of a hash-keyed JSON disk store.
+
+    Keys are namespaced by their prefix before the first "_" (``youtube_``,
+    ``spotify_``) and each namespace may carry its own TTL in seconds.
+    """
+
+    def __init__(self, directory, max_entries=2048, max_bytes=32 * 1024 * 1024,
+                 ttls=None, default_ttl=None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self._memory = OrderedDict()  # key -> (expires_at, size, data)
+        self._memory_bytes = 0
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+        os.makedirs(directory, exist_ok=True)
+
+    # ✅ Helpers
+    def _ttl_for(self, key):
+        namespace = key.split("_", 1)[0]
+        return self.ttls.get(namespace, self.default_ttl)
+
+    def _path_for(self, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    @staticmethod
+    def _expired(expires_at, now=None):
+        return expires_at is not None and expires_at <= (now or time.time())
+
+    def _remember(self, key, expires_at, data, size):
+        old = self._memory.pop(key, None)
+        if old:
+            self._memory_bytes -= old[1]
+        if size > self.max_bytes:
+            return
+        self._memory[key] = (expires_at, size, data)
+        self._memory_bytes += size
+        while len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+            self.stats["evictions"] += 1
+
+    def _forget(self, key):
+        entry = self._memory.pop(key, None)
+        if entry:
+            self._memory_bytes -= entry[1]
+
+    # ✅ Public API
+    async def get(self, key):
+        entry = self._memory.get(key)
+        if entry:
+            if not self._expired(entry[0]):
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry[2]
+            self._forget(key)
+            self.stats["expirations"] += 1
+
+        path = self._path_for(key)
+        try:
+            async with aiofiles.open(path, "r") as f:
+                raw = await f.read()
+            record = json.loads(raw)
+        except FileNotFoundError:
+            self.stats["misses"] += 1
+            return None
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"⚠️ Corrupt cache entry for {key}: {e}")
+            self.stats["misses"] += 1
+            return None
+
+        if record.get("key") != key or self._expired(record.get("expires_at")):
+            self.stats["misses"] += 1
+            return None
+        self._remember(key, record.get("expires_at"), record["data"], len(raw))
+        self.stats["disk_hits"] += 1
+        return record["data"]
+
+    async def set(self, key, data):
+        ttl = self._ttl_for(key)
+        expires_at = time.time() + ttl if ttl else None
+        raw = json.dumps({"key": key, "expires_at": expires_at, "data": data})
+        self._remember(key, expires_at, data, len(raw))
+        path = self._path_for(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            async with aiofiles.open(tmp_path, "w") as f:
+                await f.write(raw)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"❌ Cache Write Error: {e}")
+
+    async def delete(self, key):
+        self._forget(key)
+        try:
+            os.remove(self._path_for(key))
+        except FileNotFoundError:
+            pass
+
+    def snapshot(self):
+        return dict(self.stats, memory_entries=len(self._memory), memory_bytes=self._memory_bytes)
+
+    # ✅ Background Eviction
+    def _sweep_disk(self):
+        now = time.time()
+        removed = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    with open(entry.path, "r") as f:
+                        expires_at = json.load(f).get("expires_at")
+                except (OSError, json.JSONDecodeError, AttributeError):
+                    continue
+                if self._expired(expires_at, now):
+                    try:
+                        os.remove(entry.path)
+                        removed += 1
+                    except OSError:
+                        pass
+        return removed
+
+    async def sweep(self):
+        now = time.time()
+        for key in [k for k, (exp, _, _) in self._memory.items() if self._expired(exp, now)]:
+            self._forget(key)
+            self.stats["expirations"] += 1
+        removed = await asyncio.get_running_loop().run_in_executor(None, self._sweep_disk)
+        self.stats["expirations"] += removed
+
+    async def run_eviction(self, interval=600):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"❌ Cache Eviction Error: {e}")
+
+
+def normalize_query(query):
+    """Case-fold and collapse whitespace so trivially different queries share a key."""
+    return " ".join(query.casefold().split())
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one shared future.
+
+    A ``None`` result is remembered for ``negative_ttl`` seconds so a bad
+    query cannot cause a retry storm. Exceptions are shared with the callers
+    already waiting but not remembered, since they usually mean "try later".
+    """
+
+    def __init__(self, negative_ttl=30, max_failures=4096):
+        self.negative_ttl = negative_ttl
+        self.max_failures = max_failures
+        self._inflight = {}
+        self._failures = {}  # key -> expires_at
+        self.stats = {"calls": 0, "coalesced": 0, "negative_hits": 0}
+
+    async def run(self, key, factory):
+        self.stats["calls"] += 1
+        expires_at = self._failures.get(key)
+        if expires_at is not None:
+            if expires_at > time.monotonic():
+                self.stats["negative_hits"] += 1
+                return None
+            del self._failures[key]
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._execute(key, factory))
+            self._inflight[key] = future
+        else:
+            self.stats["coalesced"] += 1
+        # shield: one caller giving up must not cancel the lookup for everyone else
+        return await asyncio.shield(future)
+
+    async def _execute(self, key, factory):
+        try:
+            result = await factory()
+        finally:
+            self._inflight.pop(key, None)
+        if result is None:
+            self._remember_failure(key)
+        return result
+
+    def _remember_failure(self, key):
+        now = time.monotonic()
+        if len(self._failures) >= self.max_failures:
+            self._failures = {k: exp for k, exp in self._failures.items() if exp > now}
+        self._failures[key] = now + self.negative_ttl
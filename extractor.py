@@ -0,0 +1,219 @@
+import asyncio
+import contextvars
+import logging
+import multiprocessing
+import os
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# Set inside ExtractionEngine.reservation(); copied into tasks spawned there (e.g. shared lookups)
+_reservation = contextvars.ContextVar("extraction_reservation", default=None)
+
+# ✅ Worker-side state: one long-lived YoutubeDL per worker thread/process
+_local = threading.local()
+
+
+def _init_worker(ydl_opts):
+    # yt-dlp takes a while to import; only the workers need it, so the bot starts without it
+    import yt_dlp as youtube_dl
+
+    ydl = youtube_dl.YoutubeDL(ydl_opts)
+    # Warm the YouTube extractors so the first real job does not pay for it
+    for name in ("Youtube", "YoutubeSearch"):
+        try:
+            ydl.get_info_extractor(name)
+        except Exception:
+            pass
+    _local.ydl = ydl
+
+
+def _init_process_worker(ydl_opts):
+    from logging_setup import setup_worker_logging
+
+    setup_worker_logging()
+    _init_worker(ydl_opts)
+
+
+def _process_context():
+    # Never fork: the parent already runs the event loop, the log listener and thread pools,
+    # and a forked child can inherit their locks held. Workers re-import the main script as
+    # __mp_main__, so its module level must stay free of side effects on shared state.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _ping():
+    return os.getpid()
+
+
+def _extract(target):
+    from yt_dlp.utils import DownloadError
+
+    ydl = _local.ydl
+    try:
+        info = ydl.extract_info(target, download=False)
+    except DownloadError as e:
+        raise ExtractionFailed(str(e)) from None
+    # sanitize_info makes the result JSON/pickle safe for the trip back to the loop
+    return ydl.sanitize_info(info) if info else None
+
+
+class ExtractionQueueFull(Exception):
+    pass
+
+
+class ExtractionFailed(Exception):
+    """yt-dlp could not extract the target (its DownloadError, without importing yt-dlp here)."""
+
+
+class ExtractionCancelled(Exception):
+    pass
+
+
+class ExtractionEngine:
+    """Bounded yt-dlp extraction pool with warmed YoutubeDL instances.
+
+    ``mode="process"`` spreads yt-dlp's CPU-heavy parsing over several cores;
+    ``mode="thread"`` keeps everything in-process (useful where fork is costly).
+    Jobs started with a ``job_key`` can be cancelled through ``cancel``; a job
+    already running inside a worker process cannot be interrupted, but its
+    result is discarded.
+    ``max_pending`` counts jobs until their worker is free again, so jobs
+    that outlived their ``timeout`` still hold their place in the bound.
+    The last ``reserved`` of those places only go to jobs started inside
+    ``reservation()``, so background work cannot use them all up.
+    """
+
+    def __init__(self, ydl_opts, mode="process", workers=None, max_pending=64, timeout=30, reserved=0):
+        if mode not in ("process", "thread"):
+            raise ValueError(f"Unknown extractor mode: {mode}")
+        self.ydl_opts = dict(ydl_opts)
+        self.mode = mode
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.reserved = min(reserved, max_pending)
+        self.timeout = timeout
+        self._executor = None
+        self._pending = 0
+        self._jobs = {}  # job_key -> set of asyncio futures
+        self._cancelled = set()
+
+    def _create_executor(self):
+        if self.mode == "process":
+            return ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=_process_context(),
+                initializer=_init_process_worker,
+                initargs=(self.ydl_opts,)
+            )
+        return ThreadPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.ydl_opts,)
+        )
+
+    async def start(self):
+        if self._executor is None:
+            self._executor = self._create_executor()
+        loop = asyncio.get_running_loop()
+        # Spawn every worker up front so the first /play is not a cold start
+        await asyncio.gather(*(
+            loop.run_in_executor(self._executor, _ping) for _ in range(self.workers)
+        ), return_exceptions=True)
+        logger.info(f"✅ Extraction engine ready ({self.mode}, {self.workers} workers)")
+
+    @property
+    def pending(self):
+        return self._pending
+
+    @contextmanager
+    def reservation(self):
+        """Lets extractions started in this block use the reserved slots.
+
+        Tasks spawned inside the block inherit it only until the block ends,
+        so a prefetch it kicked off does not keep using reserved slots.
+        """
+        grant = {"open": True}
+        token = _reservation.set(grant)
+        try:
+            yield
+        finally:
+            grant["open"] = False
+            _reservation.reset(token)
+
+    def _limit(self):
+        grant = _reservation.get()
+        return self.max_pending if grant and grant["open"] else self.max_pending - self.reserved
+
+    async def extract(self, target, job_key=None, timeout=None):
+        if self._pending >= self._limit():
+            raise ExtractionQueueFull(f"{self._pending} extraction jobs pending")
+        if self._executor is None:
+            self._executor = self._create_executor()
+
+        executor = self._executor
+        try:
+            job = executor.submit(_extract, target)
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise
+        # Counted until the worker is free again: a job we stopped waiting for may still hold it
+        self._pending += 1
+        loop = asyncio.get_running_loop()
+        job.add_done_callback(lambda _: self._job_finished(loop))
+        future = asyncio.wrap_future(job)
+        if job_key is not None:
+            self._jobs.setdefault(job_key, set()).add(future)
+        try:
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.CancelledError:
+            if job_key is not None and job_key in self._cancelled:
+                raise ExtractionCancelled(str(job_key)) from None
+            raise
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise
+        finally:
+            if job_key is not None:
+                jobs = self._jobs.get(job_key)
+                if jobs is not None:
+                    jobs.discard(future)
+                    if not jobs:
+                        del self._jobs[job_key]
+                        self._cancelled.discard(job_key)
+
+    def cancel(self, job_key):
+        jobs = self._jobs.get(job_key)
+        if not jobs:
+            return False
+        self._cancelled.add(job_key)
+        for future in jobs:
+            future.cancel()
+        return True
+
+    def _job_finished(self, loop):
+        # Runs in the executor's thread
+        try:
+            loop.call_soon_threadsafe(self._release_slot)
+        except RuntimeError:
+            pass  # loop already closed at shutdown
+
+    def _release_slot(self):
+        self._pending -= 1
+
+    def _restart(self, broken):
+        # Every job of a broken pool fails at once; only the first caller replaces it
+        if self._executor is not broken:
+            return
+        logger.error("❌ Extraction worker died, restarting pool")
+        self._executor = self._create_executor()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,15 +1,54 @@
-from flask import Flask
-     from threading import Thread
+import json
+import logging
+import os
 
-     app = Flask(__name__)
+from aiohttp import web
 
-     @app.route('/')
-     def home():
-         return "Bot is alive!"
+import metrics
+from metrics import REGISTRY
 
-     def run():
-         app.run(host='0.0.0.0', port=8080)
+logger = logging.getLogger(__name__)
 
-     def keep_alive():
-         t = Thread(target=run)
-         t.start()
\ No newline at end of file
+HEALTH_MAX_LOOP_LAG = float(os.environ.get("ROLA_HEALTH_MAX_LOOP_LAG", "1.0"))
+
+# name -> zero-argument callable returning True when that part of the bot is ready
+readiness_checks = {}
+
+def add_readiness_check(name, check):
+    readiness_checks[name] = check
+
+async def home(request):
+    return web.Response(text="Bot is alive!")
+
+async def metrics_handler(request):
+    return web.Response(text=REGISTRY.render(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+async def healthz(request):
+    checks = {}
+    for name, check in readiness_checks.items():
+        try:
+            checks[name] = bool(check())
+        except Exception as e:
+            logger.warning(f"⚠️ Readiness check {name} failed: {e}")
+            checks[name] = False
+    checks["loop_lag"] = metrics.loop_lag_last < HEALTH_MAX_LOOP_LAG
+    ready = all(checks.values())
+    body = {"ready": ready, "checks": checks, "loop_lag_seconds": round(metrics.loop_lag_last, 4)}
+    return web.Response(text=json.dumps(body), content_type="application/json", status=200 if ready else 503)
+
+async def start_keep_alive(host="0.0.0.0", port=None):
+    """Serve /, /healthz and /metrics on the running event loop; returns the runner."""
+    port = port or int(os.environ.get("PORT", "8080"))
+    server = web.Application()
+    server.router.add_get("/", home)
+    server.router.add_get("/healthz", healthz)
+    server.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(server, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"✅ Keep-alive server listening on {host}:{port}")
+    return runner
+
+async def stop_keep_alive(runner):
+    if runner is not None:
+        await runner.cleanup()
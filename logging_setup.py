@@ -0,0 +1,171 @@
+import gzip
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import shutil
+import time
+
+LOG_FILE = "rolavibe.log"
+CONSOLE_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+
+# Chatty third-party loggers are kept out of the file unless asked for
+DEFAULT_LEVELS = {
+    "pyrogram": "WARNING",
+    "pytgcalls": "WARNING",
+    "yt_dlp": "WARNING",
+    "aiohttp.access": "WARNING",
+    "asyncio": "WARNING",
+}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: easy to tail, filter and ship elsewhere."""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "time": self.formatTime(record, "%Y-%m-%d %H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _gzip_namer(name):
+    return f"{name}.gz"
+
+
+def _gzip_rotator(source, dest):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def _parse_levels(spec):
+    """``"pyrogram=INFO,cache=DEBUG"`` -> {"pyrogram": "INFO", "cache": "DEBUG"}"""
+    levels = {}
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        name, _, level = part.partition("=")
+        if level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(log_file=LOG_FILE):
+    """Route all records through a queue; a listener thread does the actual I/O.
+
+    Environment knobs: ROLA_LOG_LEVEL (root level), ROLA_LOG_LEVELS (per-module
+    overrides), ROLA_LOG_MAX_MB / ROLA_LOG_BACKUPS (size rotation) or
+    ROLA_LOG_ROTATE_WHEN (time rotation, e.g. "midnight"). Rotated files are gzipped.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    if multiprocessing.parent_process() is not None:
+        # An extraction worker re-importing the main script; it logs via setup_worker_logging
+        return
+
+    backups = int(os.environ.get("ROLA_LOG_BACKUPS", "5"))
+    rotate_when = os.environ.get("ROLA_LOG_ROTATE_WHEN")
+    if rotate_when:
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            log_file, when=rotate_when, backupCount=backups, encoding="utf-8", delay=True
+        )
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=int(os.environ.get("ROLA_LOG_MAX_MB", "10")) * 1024 * 1024,
+            backupCount=backups, encoding="utf-8", delay=True
+        )
+    file_handler.namer = _gzip_namer
+    file_handler.rotator = _gzip_rotator
+    file_handler.setFormatter(JsonFormatter())
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(os.environ.get("ROLA_LOG_LEVEL", "INFO").upper())
+    for name, level in {**DEFAULT_LEVELS, **_parse_levels(os.environ.get("ROLA_LOG_LEVELS"))}.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+
+def setup_worker_logging():
+    """Plain console logging for a worker process, which cannot reach the parent's queue listener.
+
+    Uses the same ROLA_LOG_LEVEL / ROLA_LOG_LEVELS settings; workers never
+    write the rotating file, since several processes would race on rotation.
+    """
+    logging.basicConfig(
+        level=os.environ.get("ROLA_LOG_LEVEL", "INFO").upper(), format=CONSOLE_FORMAT, force=True
+    )
+    for name, level in {**DEFAULT_LEVELS, **_parse_levels(os.environ.get("ROLA_LOG_LEVELS"))}.items():
+        logging.getLogger(name).setLevel(level)
+
+
+def stop_logging():
+    """Flush whatever is still queued; call once on shutdown."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _read_tail_lines(path, max_bytes):
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - max_bytes))
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    # The first line is probably cut in half unless we read from the start
+    return lines if size <= max_bytes else lines[1:]
+
+
+def tail_log(path=LOG_FILE, lines=300, since_seconds=None, min_level="INFO", logger_prefix=None,
+             max_bytes=4 * 1024 * 1024):
+    """Return the last ``lines`` matching records as readable text.
+
+    Only the end of the file is read (at most ``max_bytes``). Blocking, so
+    run it in an executor from async code.
+    """
+    threshold = logging.getLevelName(min_level.upper())
+    threshold = threshold if isinstance(threshold, int) else logging.INFO
+    cutoff = time.time() - since_seconds if since_seconds else None
+    selected = []
+    for raw in reversed(_read_tail_lines(path, max_bytes)):
+        try:
+            entry = json.loads(raw)
+        except json.JSONDecodeError:
+            continue  # pre-JSON lines from an older log
+        if cutoff is not None and entry.get("ts", 0) < cutoff:
+            break
+        level = logging.getLevelName(entry.get("level", "INFO"))
+        if isinstance(level, int) and level < threshold:
+            continue
+        if logger_prefix and not entry.get("logger", "").startswith(logger_prefix):
+            continue
+        line = f"{entry.get('time')} {entry.get('level')} {entry.get('logger')}: {entry.get('msg')}"
+        if entry.get("exc"):
+            line += f"\n{entry['exc']}"
+        selected.append(line)
+        if len(selected) >= lines:
+            break
+    return "\n".join(reversed(selected))
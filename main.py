@@ -1,42 +1,67 @@
 import logging
 import asyncio
+import io
 import json
 import os
+import time
+from functools import wraps
 from pyrogram import Client, filters, idle
-from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
+from pyrogram.types import (
+    Message, InlineKeyboardMarkup, InlineKeyboardButton, InlineQueryResultArticle, InputTextMessageContent
+)
 from pytgcalls import PyTgCalls
-from pytgcalls.types import StreamType
-from pytgcalls.types.input_stream import AudioPiped
-import yt_dlp as youtube_dl
-from yt_dlp.utils import DownloadError
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
 import aiofiles
-import aiohttp
+from cache import TwoTierCache, SingleFlight, normalize_query
+from extractor import ExtractionEngine, ExtractionQueueFull, ExtractionCancelled, ExtractionFailed
+from spotify_client import AsyncSpotify, parse_spotify_url
+from queue_store import QueueStore
+from resolver import StreamResolver, make_queue_item, upgrade_queue_item, youtube_source, youtube_link, parse_youtube_id
+from playback import PlaybackEngine, build_stream
+from track_store import TrackStore
+from metrics import REGISTRY, COMMAND_SECONDS, STAGE_SECONDS, stage, monitor_loop_lag
+from stats import BotStats
+from broadcast import BroadcastEngine, ChatDirectory
+from playlist_import import PlaylistImport
+from track_index import TrackIndex
+from autocomplete import SuggestIndex
+from relay import RelayHub, relay_source, is_relay_source
+from sharding import ShardedCalls
+from outbox import Outbox, DeferredStatus
+from admission import AdmissionController, AdmissionRejected, PRIORITY_OWNER, PRIORITY_SESSION, PRIORITY_NORMAL, PRIORITY_IMPORT
+from logging_setup import LOG_FILE, setup_logging, stop_logging, tail_log
 from config import API_ID, API_HASH, BOT_TOKEN, OWNER_ID, SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET
 
-# ✅ Keep Alive Server
-from keep_alive import keep_alive
-keep_alive()
+# ✅ Keep Alive Server (started from main() on the bot's own loop)
+from keep_alive import start_keep_alive, stop_keep_alive, add_readiness_check
 
-# ✅ Logging Setup
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.FileHandler("rolavibe.log"), logging.StreamHandler()]
-)
+# ✅ Logging Setup (queued, rotating, JSON on disk)
+setup_logging(LOG_FILE)
 logger = logging.getLogger(__name__)
+LOG_TAIL_LINES = 300
+LOG_TAIL_MINUTES = 60
 
 # ✅ Bot Client
 app = Client("RolaVibeBot", api_id=API_ID, api_hash=API_HASH, bot_token=BOT_TOKEN)
-call_py = PyTgCalls(app)
+
+# ✅ Voice Calls: in-process, or sharded across worker processes (ROLA_SHARD_WORKERS=<n>|auto)
+SHARD_WORKERS = os.environ.get("ROLA_SHARD_WORKERS", "0")
+SHARD_WORKERS = (os.cpu_count() or 1) if SHARD_WORKERS == "auto" else int(SHARD_WORKERS)
+if SHARD_WORKERS:
+    call_py = ShardedCalls("rola-shards.sock", SHARD_WORKERS, on_worker_lost=lambda chats: rejoin_chats(chats))
+else:
+    call_py = PyTgCalls(app)
+call_py_started = False
+
+# ✅ Readiness (reported on /healthz)
+add_readiness_check("pyrogram", lambda: app.is_connected)
+add_readiness_check("pytgcalls", lambda: call_py_started)
 
 # ✅ Global Variables
 queue = {}
-queue_lock = asyncio.Lock()
-is_call_active = False
+queue_store = QueueStore("queue.json", "queue.journal")
 maintenance_mode = False
 MAINTENANCE_FILE = "maintenance_mode.json"
+FM_CHANNELS_FILE = "fm_channels.json"
 FM_CHANNELS = {
     "Radio Mirchi": "http://example.com/radiomirchi",
     "Red FM": "http://example.com/redfm",
@@ -48,7 +73,15 @@ AI_ENABLED = False  # Default: AI is disabled
 
 # ✅ Cache Files
 CACHE_DIR = "cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
+CACHE_TTLS = {
+    "youtube": 6 * 60 * 60,       # 6 hours
+    "spotify": 7 * 24 * 60 * 60   # 7 days
+}
+cache = TwoTierCache(CACHE_DIR, max_entries=4096, max_bytes=64 * 1024 * 1024, ttls=CACHE_TTLS)
+
+# ✅ In-flight lookup coalescing (failures are shared for 30s)
+youtube_lookups = SingleFlight(negative_ttl=30)
+spotify_lookups = SingleFlight(negative_ttl=30)
 
 # ✅ YouTube-DL Options
 ydl_opts = {
@@ -57,16 +90,306 @@ ydl_opts = {
     'noplaylist': True
 }
 
+# ✅ yt-dlp Extraction Pool ("process" or "thread")
+EXTRACTOR_MODE = os.environ.get("ROLA_EXTRACTOR_MODE", "process")
+EXTRACTOR_WORKERS = int(os.environ.get("ROLA_EXTRACTOR_WORKERS", "0")) or None
+EXTRACTOR_MAX_PENDING = int(os.environ.get("ROLA_EXTRACTOR_MAX_PENDING", "64"))
+EXTRACTOR_TIMEOUT = int(os.environ.get("ROLA_EXTRACTOR_TIMEOUT", "30"))
+# Extractor slots only admitted lookups (/play, /playvideo, playlist imports) may take
+EXTRACTOR_RESERVED = int(os.environ.get("ROLA_EXTRACTOR_RESERVED", str(max(1, EXTRACTOR_MAX_PENDING // 2))))
+MAX_TRACK_DURATION = 600  # 10 minutes
+
+# ✅ Spotify playlist/album import (.play <url>): tracks are matched in parallel and queued as they resolve
+PLAYLIST_MAX_TRACKS = int(os.environ.get("ROLA_PLAYLIST_MAX_TRACKS", "500"))
+PLAYLIST_WORKERS = int(os.environ.get("ROLA_PLAYLIST_WORKERS", "4"))
+playlist_imports = {}  # chat_id -> running import task
+extractor = ExtractionEngine(
+    ydl_opts,
+    mode=EXTRACTOR_MODE,
+    workers=EXTRACTOR_WORKERS,
+    max_pending=EXTRACTOR_MAX_PENDING,
+    timeout=EXTRACTOR_TIMEOUT,
+    reserved=EXTRACTOR_RESERVED
+)
+
+# ✅ Stream URL Resolver (re-resolves 10 min before expiry)
+resolver = StreamResolver(extractor, safety_margin=600)
+
 # ✅ Spotify API Initialization
 sp = None
 if SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET:
-    try:
-        sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(
-            client_id=SPOTIFY_CLIENT_ID,
-            client_secret=SPOTIFY_CLIENT_SECRET
-        ))
-    except Exception as e:
-        logger.error(f"Spotify API Initialization Error: {e}")
+    sp = AsyncSpotify(SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET)
+
+# ✅ Per-Chat Playback Sessions
+class PlaybackSession:
+    """Call state, lock, queue and current track of a single chat."""
+
+    __slots__ = (
+        "chat_id", "lock", "queue", "current", "is_call_active", "paused",
+        "started_at", "paused_at", "paused_total"
+    )
+
+    def __init__(self, chat_id, items):
+        self.chat_id = chat_id
+        self.lock = asyncio.Lock()
+        self.queue = items  # same list object as queue[chat_id], so queue snapshots see it
+        self.current = None
+        self.is_call_active = False
+        self.paused = False
+        self.started_at = None  # monotonic time the current track started
+        self.paused_at = None
+        self.paused_total = 0
+
+    def elapsed(self):
+        """Seconds of the current track played so far (pauses excluded)."""
+        if self.started_at is None:
+            return 0
+        end = self.paused_at if self.paused_at is not None else time.monotonic()
+        return max(0, end - self.started_at - self.paused_total)
+
+class SessionRegistry:
+    """Lazily creates one PlaybackSession per chat; lookups are O(1) dict hits."""
+
+    def __init__(self):
+        self._sessions = {}
+
+    def get(self, chat_id):
+        session = self._sessions.get(chat_id)
+        if session is None:
+            session = PlaybackSession(chat_id, queue.setdefault(chat_id, []))
+            self._sessions[chat_id] = session
+        return session
+
+    def peek(self, chat_id):
+        return self._sessions.get(chat_id)
+
+    def drop(self, chat_id):
+        queue.pop(chat_id, None)
+        return self._sessions.pop(chat_id, None)
+
+    def active(self):
+        return [s for s in self._sessions.values() if s.is_call_active]
+
+    def reset(self):
+        self._sessions.clear()
+
+sessions = SessionRegistry()
+
+# ✅ Local Track Store (tracks played 3+ times are kept as Opus, 2 GB budget)
+TRACK_STORE_DIR = "tracks"
+TRACK_STORE_MAX_BYTES = int(os.environ.get("ROLA_TRACK_STORE_MAX_MB", "2048")) * 1024 * 1024
+TRACK_STORE_THRESHOLD = 3
+track_store = TrackStore(
+    resolver,
+    directory=TRACK_STORE_DIR,
+    max_bytes=TRACK_STORE_MAX_BYTES,
+    threshold=TRACK_STORE_THRESHOLD
+)
+
+# ✅ Spotify track -> YouTube video index (plus normalized queries), so repeat songs skip both searches
+track_index = TrackIndex("track_index.jsonl")
+
+# ✅ Inline Search Suggestions (prefix/trigram index over resolved titles, rebuilt from the track index at startup)
+suggestions = SuggestIndex(max_entries=int(os.environ.get("ROLA_SUGGEST_MAX_TRACKS", "20000")))
+
+# ✅ Bot Statistics (sketches + counters, flushed to stats.json every minute)
+bot_stats = BotStats("stats.json")
+
+def record_track_start(chat_id, item):
+    track_key = item["source"] if item["id"] in ("video", "radio") else item["id"]
+    bot_stats.record_play(chat_id, track_key, item["title"])
+    if item["source"] == youtube_source(item["id"]):
+        suggestions.add(item["id"], item["title"], item["duration"], plays=bot_stats.tracks.get(track_key, [0])[0])
+    outbox.touch(chat_id)
+
+# ✅ Broadcast (every chat we have seen; rate-limited, resumable after a restart)
+BROADCAST_RATE = float(os.environ.get("ROLA_BROADCAST_RATE", "25"))
+BROADCAST_CONCURRENCY = int(os.environ.get("ROLA_BROADCAST_CONCURRENCY", "20"))
+chat_directory = ChatDirectory("chats.json")
+broadcaster = BroadcastEngine(
+    app, "broadcast_state.json", rate=BROADCAST_RATE, concurrency=BROADCAST_CONCURRENCY,
+    on_chat_gone=chat_directory.discard
+)
+awaiting_broadcast = False
+
+# ✅ Radio Relay (one upstream connection + decode per station, shared by every call playing it)
+RADIO_HEALTH_INTERVAL = int(os.environ.get("ROLA_RADIO_HEALTH_INTERVAL", "300"))
+relay_hub = RelayHub("relay")
+
+# ✅ Live Now-Playing Message (one per chat, edited in place; edits coalesced, at most one per 2s)
+NOW_PLAYING_REFRESH = int(os.environ.get("ROLA_NOW_PLAYING_REFRESH", "20"))
+NOW_PLAYING_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("⏸️ पॉज़", callback_data="pause"),
+     InlineKeyboardButton("▶️ रिज्यूम", callback_data="resume"),
+     InlineKeyboardButton("⏭️ स्किप", callback_data="skip"),
+     InlineKeyboardButton("⏹️ रोकें", callback_data="stop")],
+    [InlineKeyboardButton("🔍 विस्तार करें", callback_data="expand")]
+])
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+def progress_bar(elapsed, duration, width=12):
+    filled = min(width, int(width * elapsed / duration))
+    return f"⏱️ `{format_duration(min(elapsed, duration))}` {'▰' * filled}{'▱' * (width - filled)} `{format_duration(duration)}`"
+
+def render_now_playing(chat_id):
+    session = sessions.peek(chat_id)
+    if session is None or not session.is_call_active or session.current is None:
+        return None
+    item = session.current
+    photo, link = None, None
+    if item["id"] == "video":
+        heading = "🎥 **अभी चल रहा वीडियो:**"
+        link = f"🔗 [वीडियो देखें]({item['source']})"
+    else:
+        heading = "🎵 **अभी चल रहा है:**"
+        if item["source"] == youtube_source(item["id"]):
+            photo = get_thumbnail(item["id"])
+            link = f"🔗 [YouTube पर देखें](https://youtu.be/{item['id']})"
+    if session.paused:
+        heading = "⏸️ **पॉज़ किया गया:**"
+    lines = [f"{heading} `{item['title']}`"]
+    if link:
+        lines.append(link)
+    if item["duration"]:
+        lines.append(progress_bar(session.elapsed(), item["duration"]))
+    if len(session.queue) > 1:
+        lines.append(f"📋 कतार में अगले: `{len(session.queue) - 1}`")
+    lines.append("\n🎧 *Rola Vibe का आनंद लें!*")
+    return photo, "\n".join(lines), NOW_PLAYING_MARKUP
+
+outbox = Outbox(app, render_now_playing, min_interval=2.0, closing_text="⏹️ *प्लेबैक समाप्त हो गया।*")
+
+# ✅ Playback Engine (auto-advance, next track prepared ahead, 500ms gap target)
+playback = PlaybackEngine(
+    call_py, sessions, resolver, queue_store,
+    prefetch_depth=2, gap_target=0.5, track_store=track_store,
+    on_track_start=record_track_start, on_session_end=outbox.forget, relay=relay_hub,
+    # Shard workers build the input stream themselves, so they only get the path/URL
+    stream_factory=(lambda stream_url: stream_url) if SHARD_WORKERS else build_stream
+)
+
+# ✅ Admission Control (global + per-chat limits, bounded priority wait queue for play requests)
+admission = AdmissionController(
+    # Default: one per reserved extractor slot. An admitted lookup runs one extraction at a time inside
+    # extractor.reservation(), and prefetch, track store, startup warming and inline misses cannot take
+    # those slots, so admitted requests only see ExtractionQueueFull while timed-out jobs still hold theirs
+    max_active=int(os.environ.get("ROLA_ADMISSION_MAX_ACTIVE", str(EXTRACTOR_RESERVED))),
+    max_per_chat=int(os.environ.get("ROLA_ADMISSION_PER_CHAT", "2")),
+    max_waiting=int(os.environ.get("ROLA_ADMISSION_MAX_WAITING", "128")),
+    max_wait=float(os.environ.get("ROLA_ADMISSION_MAX_WAIT", "15"))
+)
+# Inline search misses get their own small limiter keyed by user, so typing never takes play slots
+inline_admission = AdmissionController(
+    max_active=int(os.environ.get("ROLA_INLINE_MAX_ACTIVE", "2")),
+    max_per_chat=1,
+    max_waiting=int(os.environ.get("ROLA_INLINE_MAX_WAITING", "16")),
+    max_wait=float(os.environ.get("ROLA_INLINE_MAX_WAIT", "3"))
+)
+
+def admission_priority(message):
+    if message.from_user and message.from_user.id == OWNER_ID:
+        return PRIORITY_OWNER
+    session = sessions.peek(message.chat.id)
+    if session and session.is_call_active:
+        return PRIORITY_SESSION
+    return PRIORITY_NORMAL
+
+def admitted(func):
+    @wraps(func)
+    async def wrapper(client, message):
+        started = time.monotonic()
+        try:
+            async with admission.slot(message.chat.id, admission_priority(message)):
+                STAGE_SECONDS.observe(time.monotonic() - started, stage="admission_wait")
+                return await func(client, message)
+        except AdmissionRejected as e:
+            logger.warning(f"⚠️ Play request shed in {message.chat.id}: {e}")
+            await message.reply_text("⏳ *बॉट अभी बहुत व्यस्त है। कृपया कुछ सेकंड बाद पुनः प्रयास करें।*")
+    return wrapper
+
+# ✅ Metrics (served on /metrics by the keep-alive server)
+def timed_command(command):
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(client, update):
+            with COMMAND_SECONDS.time(command=command):
+                return await func(client, update)
+        return wrapper
+    return decorator
+
+REGISTRY.gauge("rola_active_calls", "Voice calls currently joined", lambda: len(sessions.active()))
+REGISTRY.gauge(
+    "rola_chat_active_call", "1 while the bot is in the chat's voice call",
+    lambda: {(s.chat_id,): 1 for s in sessions.active()}, ["chat_id"]
+)
+REGISTRY.gauge(
+    "rola_queue_depth", "Queued tracks per chat (including the one playing)",
+    lambda: {(chat_id,): len(items) for chat_id, items in list(queue.items()) if items}, ["chat_id"]
+)
+REGISTRY.gauge("rola_extractor_pending_jobs", "yt-dlp jobs queued or running", lambda: extractor.pending)
+REGISTRY.gauge("rola_queue_journal_buffered", "Queue journal records not yet written", lambda: queue_store.buffered)
+REGISTRY.counter_from(
+    "rola_cache_events_total", "Two-tier cache hits, misses and evictions",
+    lambda: {(event,): count for event, count in cache.stats.items()}, ["event"]
+)
+REGISTRY.gauge("rola_cache_memory_bytes", "Bytes held by the in-memory cache tier", lambda: cache.snapshot()["memory_bytes"])
+REGISTRY.counter_from(
+    "rola_lookup_events_total", "Single-flight lookup calls, coalesced waits and negative-cache hits",
+    lambda: {
+        (service, event): count
+        for service, flight in (("youtube", youtube_lookups), ("spotify", spotify_lookups))
+        for event, count in flight.stats.items()
+    },
+    ["service", "event"]
+)
+REGISTRY.gauge("rola_track_index_entries", "Spotify tracks mapped to a YouTube video", lambda: len(track_index))
+REGISTRY.counter_from(
+    "rola_track_index_lookups_total", "Track index lookups by result",
+    lambda: {(result,): value for result, value in track_index.stats.items()}, labelnames=("result",)
+)
+REGISTRY.gauge("rola_suggest_entries", "Tracks in the inline search suggestion index", lambda: len(suggestions))
+REGISTRY.counter_from(
+    "rola_suggest_lookups_total", "Inline search suggestion lookups by result",
+    lambda: {(result,): value for result, value in suggestions.stats.items()}, labelnames=("result",)
+)
+REGISTRY.gauge("rola_relay_sources", "Upstream streams being decoded by the relay", lambda: relay_hub.snapshot()["sources"])
+REGISTRY.gauge("rola_relay_subscribers", "Calls fed from a shared relay decode", lambda: relay_hub.snapshot()["subscribers"])
+REGISTRY.gauge(
+    "rola_radio_station_up", "1 if the radio station answered its last health probe",
+    lambda: {(name,): int(relay_hub.is_healthy(url)) for name, url in FM_CHANNELS.items()}, labelnames=("station",)
+)
+if SHARD_WORKERS:
+    REGISTRY.gauge(
+        "rola_shard_worker_calls", "Voice calls served by each shard worker",
+        lambda: {(str(index),): worker["calls"] for index, worker in call_py.snapshot().items()}, labelnames=("worker",)
+    )
+    REGISTRY.gauge(
+        "rola_shard_worker_up", "1 if the shard worker is connected",
+        lambda: {(str(index),): int(worker["alive"]) for index, worker in call_py.snapshot().items()}, labelnames=("worker",)
+    )
+REGISTRY.gauge("rola_admission_active", "Play requests currently admitted", lambda: admission.active)
+REGISTRY.gauge("rola_admission_waiting", "Play requests waiting for admission", lambda: admission.waiting)
+REGISTRY.counter_from(
+    "rola_admission_events_total", "Admission decisions by outcome",
+    lambda: {(outcome,): value for outcome, value in admission.stats.items()}, labelnames=("outcome",)
+)
+REGISTRY.counter_from(
+    "rola_inline_admission_events_total", "Inline search miss admission decisions by outcome",
+    lambda: {(outcome,): value for outcome, value in inline_admission.stats.items()}, labelnames=("outcome",)
+)
+REGISTRY.counter_from(
+    "rola_now_playing_updates_total", "Live now-playing message sends, edits, skipped no-op renders and FloodWaits",
+    lambda: {(event,): value for event, value in outbox.stats.items()}, labelnames=("event",)
+)
+REGISTRY.gauge(
+    "rola_startup_seconds", "Time spent in each startup phase of the current process",
+    lambda: {(phase,): seconds for phase, seconds in startup_timings.items()}, labelnames=("phase",)
+)
+REGISTRY.gauge("rola_track_store_bytes", "Bytes used by locally stored tracks", lambda: track_store.total_bytes)
 
 # ✅ Helper Functions
 async def load_maintenance_mode():
@@ -85,6 +408,27 @@ async def save_maintenance_mode():
     except Exception as e:
         logger.error(f"❌ Maintenance Mode Save Error: {e}")
 
+async def load_fm_channels():
+    global FM_CHANNELS
+    try:
+        async with aiofiles.open(FM_CHANNELS_FILE, "r") as f:
+            data = await f.read()
+        channels = json.loads(data) if data else {}
+        # An empty file (first run) keeps the built-in stations
+        if channels:
+            FM_CHANNELS = channels
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        logger.error(f"❌ FM Channels Load Error: {e}")
+
+async def save_fm_channels():
+    tmp_path = f"{FM_CHANNELS_FILE}.tmp"
+    try:
+        async with aiofiles.open(tmp_path, "w") as f:
+            await f.write(json.dumps(FM_CHANNELS, indent=2, ensure_ascii=False))
+        os.replace(tmp_path, FM_CHANNELS_FILE)
+    except Exception as e:
+        logger.error(f"❌ FM Channels Save Error: {e}")
+
 async def ensure_files_exist():
     files = ["queue.json", "admin_commands.json", "allowed_groups.json", "fm_channels.json"]
     for file in files:
@@ -95,16 +439,18 @@ async def ensure_files_exist():
 async def load_queue():
     global queue
     try:
-        async with aiofiles.open("queue.json", "r") as f:
-            data = await f.read()
-            queue = json.loads(data) if data else {}
-    except (FileNotFoundError, json.JSONDecodeError):
+        restored = await queue_store.load()
+        queue = {chat_id: [upgrade_queue_item(item) for item in items] for chat_id, items in restored.items()}
+    except Exception as e:
+        logger.error(f"❌ Queue Load Error: {e}")
         queue = {}
+    sessions.reset()
+    queue_store.start(lambda: queue)
 
 async def save_queue():
+    # Individual changes are journaled as they happen; this writes a compacted snapshot
     try:
-        async with aiofiles.open("queue.json", "w") as f:
-            await f.write(json.dumps(queue))
+        await queue_store.compact(queue)
     except Exception as e:
         logger.error(f"❌ Queue Save Error: {e}")
 
@@ -118,69 +464,125 @@ async def auto_save():
         except Exception as e:
             logger.error(f"❌ Auto-Save Error: {e}")
 
+# ✅ Admin Permission Cache
+ADMIN_COMMANDS_FILE = "admin_commands.json"
+ADMIN_STATUS_TTL = 300  # seconds a chat-member status is trusted
+ADMIN_STATUS_MAX_ENTRIES = 50000
+allowed_admin_commands = set()
+admin_status_cache = {}  # (chat_id, user_id) -> (status, expires_at)
+
+async def load_admin_commands():
+    global allowed_admin_commands
+    try:
+        async with aiofiles.open(ADMIN_COMMANDS_FILE, "r") as f:
+            data = await f.read()
+            allowed_admin_commands = set(json.loads(data).get("allowed_admin_commands", [])) if data else set()
+    except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+        allowed_admin_commands = set()
+
+async def save_admin_commands():
+    try:
+        async with aiofiles.open(ADMIN_COMMANDS_FILE, "w") as f:
+            await f.write(json.dumps({"allowed_admin_commands": sorted(allowed_admin_commands)}))
+    except Exception as e:
+        logger.error(f"❌ Admin Commands Save Error: {e}")
+
+async def get_member_status(chat_id, user_id):
+    key = (chat_id, user_id)
+    entry = admin_status_cache.get(key)
+    now = time.monotonic()
+    if entry and entry[1] > now:
+        return entry[0]
+    member = await app.get_chat_member(chat_id, user_id)
+    if len(admin_status_cache) >= ADMIN_STATUS_MAX_ENTRIES:
+        for stale in [k for k, (_, exp) in admin_status_cache.items() if exp <= now]:
+            del admin_status_cache[stale]
+        if len(admin_status_cache) >= ADMIN_STATUS_MAX_ENTRIES:
+            admin_status_cache.clear()
+    admin_status_cache[key] = (member.status, now + ADMIN_STATUS_TTL)
+    return member.status
+
 async def is_admin_and_allowed(chat_id, user_id, command):
+    # In-memory ACL first: a disabled command never costs an API round trip
+    if command not in allowed_admin_commands:
+        return False
     try:
-        member = await app.get_chat_member(chat_id, user_id)
-        if member.status not in ["administrator", "creator"]:
-            return False
-        async with aiofiles.open("admin_commands.json", "r") as f:
-            data = json.loads(await f.read())
-            return command in data.get("allowed_admin_commands", [])
+        return await get_member_status(chat_id, user_id) in ["administrator", "creator"]
     except Exception as e:
         logger.error(f"Admin Check Error: {e}")
         return False
 
 # ✅ Cache Function
 async def get_cached_data(cache_key):
-    cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
-    if os.path.exists(cache_file):
-        async with aiofiles.open(cache_file, "r") as f:
-            return json.loads(await f.read())
-    return None
+    with stage("cache_get"):
+        return await cache.get(cache_key)
 
 async def save_cached_data(cache_key, data):
-    cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
-    async with aiofiles.open(cache_file, "w") as f:
-        await f.write(json.dumps(data))
+    with stage("cache_set"):
+        await cache.set(cache_key, data)
 
 # ✅ Async YouTube Search with Caching
 async def get_youtube_video(query):
+    query = normalize_query(query)
     cache_key = f"youtube_{query}"
     cached_data = await get_cached_data(cache_key)
     if cached_data:
         return cached_data
+    return await youtube_lookups.run(cache_key, lambda: _search_youtube(query, cache_key))
 
-    loop = asyncio.get_event_loop()
+async def _search_youtube(query, cache_key):
     try:
-        with youtube_dl.YoutubeDL(ydl_opts) as ydl:
-            info = await loop.run_in_executor(None, lambda: ydl.extract_info(f"ytsearch:{query}", download=False))
-            if "entries" in info and len(info["entries"]) > 0:
-                video = info["entries"][0]
-                await save_cached_data(cache_key, video)
-                return video
-            return None
+        with stage("youtube_search"):
+            info = await extractor.extract(f"ytsearch:{query}")
+        if info and info.get("entries"):
+            video = info["entries"][0]
+            await save_cached_data(cache_key, video)
+            return video
+        return None
+    except ExtractionQueueFull:
+        raise
     except Exception as e:
         logger.error(f"❌ YouTube Search Error: {e}")
         return None
 
+async def get_youtube_video_by_id(video_id):
+    cache_key = f"youtube_id_{video_id}"
+    cached_data = await get_cached_data(cache_key)
+    if cached_data:
+        return cached_data
+    return await youtube_lookups.run(cache_key, lambda: _fetch_youtube_video(video_id, cache_key))
+
+async def _fetch_youtube_video(video_id, cache_key):
+    with stage("youtube_search"):
+        info = await extractor.extract(youtube_source(video_id))
+    if not info:
+        return None
+    video = {
+        "id": info.get("id") or video_id,
+        "title": info.get("title", "Unknown Title"),
+        "duration": info.get("duration") or 0,
+        "url": info.get("url"),
+    }
+    await save_cached_data(cache_key, video)
+    return video
+
 # ✅ Async Spotify API Call with Caching
 async def get_spotify_song_details(query):
+    query = normalize_query(query)
     cache_key = f"spotify_{query}"
     cached_data = await get_cached_data(cache_key)
     if cached_data:
         return cached_data
+    return await spotify_lookups.run(cache_key, lambda: _search_spotify(query, cache_key))
 
+async def _search_spotify(query, cache_key):
     try:
         if not sp:
             return None
-        results = sp.search(q=query, limit=1)
-        if results["tracks"]["items"]:
-            track = results["tracks"]["items"][0]
-            song_details = {
-                "title": track["name"],
-                "artist": track["artists"][0]["name"],
-                "url": track["external_urls"]["spotify"]
-            }
+        with stage("spotify_search"):
+            items = await sp.search_tracks(query, limit=1)
+        if items:
+            song_details = spotify_song_details(items[0])
             await save_cached_data(cache_key, song_details)
             return song_details
         return None
@@ -188,18 +590,102 @@ async def get_spotify_song_details(query):
         logger.error(f"❌ Spotify API Error: {e}")
         return None
 
+def spotify_song_details(track):
+    return {
+        "id": track["id"],
+        "title": track["name"],
+        "artist": track["artists"][0]["name"] if track.get("artists") else "",
+        "url": track.get("external_urls", {}).get("spotify", "")
+    }
+
+async def get_spotify_track(track_id):
+    cache_key = f"spotify_track_{track_id}"
+    cached_data = await get_cached_data(cache_key)
+    if cached_data:
+        return cached_data
+    try:
+        with stage("spotify_search"):
+            tracks = await sp.get_tracks([track_id]) if sp else []
+    except Exception as e:
+        logger.error(f"❌ Spotify API Error: {e}")
+        return None
+    if not tracks:
+        return None
+    song_details = spotify_song_details(tracks[0])
+    await save_cached_data(cache_key, song_details)
+    return song_details
+
 def get_thumbnail(video_id):
     return f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg"
 
-async def is_group_allowed(chat_id):
+# ✅ Allowed Group Registry (in memory, hot-reloaded when the file is edited by hand)
+ALLOWED_GROUPS_FILE = "allowed_groups.json"
+ALLOWED_GROUPS_POLL_INTERVAL = 5
+allowed_groups = {}  # chat_id -> value stored in allowed_groups.json
+allowed_groups_mtime = None
+allowed_groups_save_lock = asyncio.Lock()
+
+def _allowed_groups_file_mtime():
+    try:
+        return os.stat(ALLOWED_GROUPS_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+async def load_allowed_groups():
+    global allowed_groups, allowed_groups_mtime
+    # Taken before reading, so a write landing mid-read still looks new on the next check
+    mtime = _allowed_groups_file_mtime()
     try:
-        async with aiofiles.open("allowed_groups.json", "r") as f:
+        async with aiofiles.open(ALLOWED_GROUPS_FILE, "r") as f:
             data = await f.read()
-            allowed_groups = json.loads(data) if data else {}
-            return str(chat_id) in allowed_groups
-    except (FileNotFoundError, json.JSONDecodeError):
+            allowed_groups = {int(k): v for k, v in json.loads(data).items()} if data else {}
+        # Only after a good parse: a half-written file is read again on the next check
+        allowed_groups_mtime = mtime
+        return True
+    except (FileNotFoundError, json.JSONDecodeError, ValueError, AttributeError) as e:
+        logger.error(f"❌ Allowed Groups Load Error: {e}")
         return False
 
+async def save_allowed_groups():
+    global allowed_groups_mtime
+    async with allowed_groups_save_lock:
+        try:
+            tmp_file = f"{ALLOWED_GROUPS_FILE}.tmp"
+            async with aiofiles.open(tmp_file, "w") as f:
+                await f.write(json.dumps({str(k): v for k, v in allowed_groups.items()}))
+            os.replace(tmp_file, ALLOWED_GROUPS_FILE)
+            allowed_groups_mtime = _allowed_groups_file_mtime()
+        except Exception as e:
+            logger.error(f"❌ Allowed Groups Save Error: {e}")
+
+def add_allowed_group(chat_id):
+    allowed_groups[chat_id] = True
+    asyncio.create_task(save_allowed_groups())
+
+def remove_allowed_group(chat_id):
+    if allowed_groups.pop(chat_id, None) is not None:
+        asyncio.create_task(save_allowed_groups())
+
+async def watch_allowed_groups():
+    while True:
+        await asyncio.sleep(ALLOWED_GROUPS_POLL_INTERVAL)
+        if _allowed_groups_file_mtime() != allowed_groups_mtime and await load_allowed_groups():
+            logger.info(f"✅ Allowed groups reloaded: {len(allowed_groups)} groups")
+
+async def is_group_allowed(chat_id):
+    return chat_id in allowed_groups
+
+# ✅ Stats: count every user and group we see (runs before the command handlers)
+@app.on_message(group=-1)
+async def stats_recorder(client, message: Message):
+    bot_stats.seen(
+        message.from_user.id if message.from_user else None,
+        message.chat.id if message.chat else None,
+        bool(message.chat) and message.chat.type in ("group", "supergroup")
+    )
+    if message.chat:
+        chat_directory.add(message.chat.id)
+
 # ✅ Commands
 @app.on_message(filters.command("start"))
 async def start(client, message: Message):
@@ -242,6 +728,7 @@ async def help_command(client, message: Message):
         "▫️ .help - यह हेल्प मेनू देखें।\n\n"
         "🔧 **एडमिन कमांड्स:**\n"
         "▫️ .play <song_name> - गाना चलाएं (केवल एडमिन)।\n"
+        "▫️ @<bot> <song_name> - टाइप करते ही गाने खोजें, चुनने पर वही गाना चलेगा।\n"
         "▫️ .stop - प्लेबैक रोकें (केवल एडमिन)।\n"
         "▫️ .pause - प्लेबैक पॉज़ करें (केवल एडमिन)।\n"
         "▫️ .resume - प्लेबैक रिज्यूम करें (केवल एडमिन)।\n"
@@ -250,7 +737,10 @@ async def help_command(client, message: Message):
         "▫️ .enableadmin <command> - एडमिन कमांड को सक्षम करें।\n"
         "▫️ .disableadmin <command> - एडमिन कमांड को अक्षम करें।\n"
         "▫️ .playvideo <video_url> - वीडियो चलाएं (केवल ओनर)।\n"
-        "▫️ .addgroup - ग्रुप को बॉट में जोड़ें (केवल ओनर)।\n\n"
+        "▫️ .addgroup - ग्रुप को बॉट में जोड़ें (केवल ओनर)।\n"
+        "▫️ .removegroup - ग्रुप को बॉट से हटाएं (केवल ओनर)।\n"
+        "▫️ .addradio <नाम> | <URL> - रेडियो स्टेशन जोड़ें (केवल ओनर)।\n"
+        "▫️ .removeradio <नाम> - रेडियो स्टेशन हटाएं (केवल ओनर)।\n\n"
         "📌 *नोट:* एडमिन कमांड्स केवल ग्रुप एडमिन और बॉट ओनर ही उपयोग कर सकते हैं।\n"
         "🎧 *Rola Vibe का आनंद लें!* 🎶"
     )
@@ -259,17 +749,18 @@ async def help_command(client, message: Message):
         help_text,
         reply_markup=InlineKeyboardMarkup([
             [InlineKeyboardButton("💬 ROLA CHAT", url="https://t.me/RolaVibeChat"),
-             InlineKeyboardButton("👨‍💻 DEVELOPER", url="https://t.me/5620922625)]
+             InlineKeyboardButton("👨‍💻 DEVELOPER", url="https://t.me/5620922625")]
         ])
     )
 
 # 🎵 Play/Rola Command (Admin Check)
 @app.on_message(filters.command(["play", "rola"], prefixes=".") & filters.group)
+@timed_command("play")
+@admitted
 async def play_rola_command(client, message: Message):
     if not await is_group_allowed(message.chat.id):
         return await message.reply_text("⚠️ यह ग्रुप बॉट का उपयोग करने के लिए अधिकृत नहीं है। कृपया बॉट ओनर से संपर्क करें।")
 
-    global is_call_active
     chat_id = message.chat.id
     user = message.from_user
 
@@ -283,66 +774,308 @@ async def play_rola_command(client, message: Message):
     if not query:
         return await message.reply_text("⚠️ *कृपया गाने का नाम दर्ज करें!*")
 
-    await message.delete()
-    searching_msg = await message.reply_text("🔍 *खोज रहा हूँ...*")
+    spotify_ref = parse_spotify_url(query)
+    if spotify_ref and spotify_ref[0] in ("playlist", "album"):
+        return await start_playlist_import(message, *spotify_ref)
 
-    try:
-        # Fetch song details from Spotify
-        spotify_song = await get_spotify_song_details(query)
-        if not spotify_song:
-            return await searching_msg.edit("⚠️ *स्पॉटिफाई पर कोई परिणाम नहीं मिला। कृपया कोई अन्य नाम आज़माएं।*")
+    youtube_id = None if spotify_ref else parse_youtube_id(query)
 
-        # Search YouTube for the song
-        info = await get_youtube_video(f"{spotify_song['title']} {spotify_song['artist']}")
-        if "entries" in info and len(info["entries"]) > 0:
-            video = info["entries"][0]
-        else:
-            raise DownloadError("No results found.")
-            
-        video_url = video["url"]
-        title = video["title"]
-        video_id = video["id"]
-        duration = video["duration"]
+    with stage("telegram_reply"):
+        await message.delete()
+    # Only shown if the lookup is slow; index and cache hits never post it
+    status = DeferredStatus(message, "🔍 *खोज रहा हूँ...*")
+
+    try:
+        with extractor.reservation():
+            if youtube_id:
+                # Inline search picks and pasted links name the exact video, so nothing is searched
+                video = suggestions.get(youtube_id) or await get_youtube_video_by_id(youtube_id)
+                if video is None:
+                    return await status.finish("⚠️ *कोई परिणाम नहीं मिला। कृपया कोई अन्य नाम आज़माएं।*")
+            else:
+                # An already-resolved song (by track URL or any wording of the query) skips both searches
+                video = track_index.by_spotify(spotify_ref[1]) if spotify_ref else track_index.by_query(query)
+                if not video:
+                    video = await resolve_spotify_song(query, spotify_ref)
+                    if video is None:
+                        return await status.finish("⚠️ *स्पॉटिफाई पर कोई परिणाम नहीं मिला। कृपया कोई अन्य नाम आज़माएं।*")
+
+        item = queue_item_from_video(video)
 
         # Check song duration
-        if duration > 600:  # 10 minutes
-            return await searching_msg.edit("⚠️ *गाना बहुत लंबा है। अधिकतम अनुमत अवधि 10 मिनट है।*")
-    except DownloadError:
-        return await searching_msg.edit("⚠️ *कोई परिणाम नहीं मिला। कृपया कोई अन्य नाम आज़माएं।*")
+        if item["duration"] > MAX_TRACK_DURATION:
+            return await status.finish("⚠️ *गाना बहुत लंबा है। अधिकतम अनुमत अवधि 10 मिनट है।*")
+    except ExtractionQueueFull:
+        return await status.finish("⚠️ *बॉट अभी व्यस्त है। कृपया थोड़ी देर बाद पुनः प्रयास करें।*")
+    except ExtractionFailed:
+        return await status.finish("⚠️ *कोई परिणाम नहीं मिला। कृपया कोई अन्य नाम आज़माएं।*")
     except Exception as e:
         logger.error(f"Play Command Error: {e}")
-        return await searching_msg.edit("⚠️ *एक त्रुटि हुई। कृपया बाद में पुनः प्रयास करें।*")
+        return await status.finish("⚠️ *एक त्रुटि हुई। कृपया बाद में पुनः प्रयास करें।*")
 
-    await searching_msg.delete()
+    with stage("telegram_reply"):
+        await status.discard()
 
-    # Add song to queue
-    async with queue_lock:
-        queue.setdefault(chat_id, []).append((video_url, title, video_id))
-        await save_queue()
+    # Add song to this chat's queue and join its voice call if not already joined
+    try:
+        await enqueue_item(chat_id, item)
+    except Exception as e:
+        logger.error(f"Play Command Error: {e}")
+        return await message.reply_text("⚠️ *एक त्रुटि हुई। कृपया बाद में पुनः प्रयास करें।*")
+
+async def resolve_spotify_song(query, spotify_ref=None):
+    """Spotify lookup, then YouTube; returns None if Spotify has no match."""
+    # Fetch song details from Spotify
+    if spotify_ref:
+        spotify_song = await get_spotify_track(spotify_ref[1])
+    else:
+        spotify_song = await get_spotify_song_details(query)
+    if not spotify_song:
+        return None
 
-    # Join voice call if not already joined
-    if not is_call_active:
-        await call_py.join_group_call(
-            chat_id,
-            AudioPiped(video_url, stream_type=StreamType().pulse_stream)
+    # A new wording of a song we already matched only costs the Spotify search
+    video = track_index.by_spotify(spotify_song["id"])
+    if video:
+        track_index.add_alias(query, spotify_song["id"])
+        return video
+
+    # Search YouTube for the song
+    video = await get_youtube_video(f"{spotify_song['title']} {spotify_song['artist']}")
+    if not video:
+        raise ExtractionFailed("No results found.")
+    track_index.add(spotify_song["id"], video, query=None if spotify_ref else query)
+    return video
+
+def queue_item_from_video(video):
+    item = make_queue_item(youtube_source(video["id"]), video["title"], video["id"], video.get("duration") or 0)
+    suggestions.add(item["id"], item["title"], item["duration"])
+    # The search result's URL may still be fresh; the resolver ignores it if not
+    resolver.prime(item["source"], video.get("url"))
+    return item
+
+async def enqueue_item(chat_id, item):
+    """Append to the chat's queue and start playback if idle; returns True if it started."""
+    while True:
+        session = sessions.get(chat_id)
+        async with session.lock:
+            # A concurrent .stop may have dropped this session while we waited for its lock
+            if sessions.peek(chat_id) is not session:
+                continue
+            session.queue.append(item)
+            queue_store.push(chat_id, item)
+            if session.is_call_active:
+                playback.schedule_prepare(session)
+                outbox.touch(chat_id)  # queue count on the live message
+                return False
+            try:
+                await playback.start(session)
+            except Exception:
+                if item in session.queue:
+                    index = session.queue.index(item)
+                    session.queue.pop(index)
+                    queue_store.pop(chat_id, index)
+                raise
+            return True
+
+# 🔎 Inline Search (@bot <song name>): suggestions from the local index, network search only on a miss
+INLINE_PAGE_SIZE = 10
+INLINE_MAX_RESULTS = 50
+INLINE_DEBOUNCE = float(os.environ.get("ROLA_INLINE_DEBOUNCE", "0.8"))
+inline_latest = {}  # user_id -> id of that user's newest inline query
+
+def inline_result(track):
+    # Picking a result sends ".play <link>" as the user; the play path takes the ID from the link
+    return InlineQueryResultArticle(
+        title=track["title"],
+        input_message_content=InputTextMessageContent(f".play {youtube_link(track['id'])}"),
+        id=track["id"],
+        description=f"⏱️ {format_duration(track['duration'])}" if track["duration"] else "🎵 YouTube",
+        thumb_url=f"https://img.youtube.com/vi/{track['id']}/mqdefault.jpg"
+    )
+
+@app.on_inline_query()
+async def inline_search(client, inline_query):
+    user_id = inline_query.from_user.id
+    inline_latest[user_id] = inline_query.id
+    query = inline_query.query.strip()
+    try:
+        offset = int(inline_query.offset or 0)
+    except ValueError:
+        offset = 0
+
+    try:
+        tracks = suggestions.search(query, limit=INLINE_MAX_RESULTS)
+        if not tracks and query:
+            # Each keystroke is a new query: only search once the user has stopped typing
+            await asyncio.sleep(INLINE_DEBOUNCE)
+            if inline_latest.get(user_id) != inline_query.id:
+                return
+            video = await search_inline_miss(user_id, query)
+            tracks = [suggestions.get(video["id"]) or video] if video else []
+
+        page = tracks[offset:offset + INLINE_PAGE_SIZE]
+        more = offset + INLINE_PAGE_SIZE < len(tracks)
+        await inline_query.answer(
+            [inline_result(track) for track in page],
+            cache_time=60 if page else 5,
+            next_offset=str(offset + INLINE_PAGE_SIZE) if more else ""
         )
-        is_call_active = True
-
-    # Send now playing message with Expand option
-    await message.reply_photo(
-        photo=get_thumbnail(video_id),
-        caption=f"🎵 **अभी चल रहा है:** `{title}`\n"
-                f"🔗 [YouTube पर देखें](https://youtu.be/{video_id})\n\n"
-                "🎧 *Rola Vibe का आनंद लें!*",
-        reply_markup=InlineKeyboardMarkup([
-            [InlineKeyboardButton("⏸️ पॉज़", callback_data="pause"),
-             InlineKeyboardButton("▶️ रिज्यूम", callback_data="resume"),
-             InlineKeyboardButton("⏭️ स्किप", callback_data="skip"),
-             InlineKeyboardButton("⏹️ रोकें", callback_data="stop")],
-            [InlineKeyboardButton("🔍 विस्तार करें", callback_data="expand")]
-        ])
+    except Exception as e:
+        logger.error(f"Inline Search Error: {e}")
+    finally:
+        if inline_latest.get(user_id) == inline_query.id:
+            del inline_latest[user_id]
+
+async def search_inline_miss(user_id, query):
+    """The play path's lookup for a query the local index does not know."""
+    try:
+        async with inline_admission.slot(user_id):
+            video = track_index.by_query(query) or await resolve_spotify_song(query)
+    except (AdmissionRejected, ExtractionQueueFull, ExtractionFailed):
+        return None
+    if video:
+        queue_item_from_video(video)  # indexes it and keeps its stream URL for the pick
+    return video
+
+# ✅ Spotify Playlist/Album Import
+async def match_spotify_track(chat_id, track):
+    video = track_index.by_spotify(track["id"])
+    if video:
+        return None if video["duration"] > MAX_TRACK_DURATION else queue_item_from_video(video)
+    song = spotify_song_details(track)
+    for attempt in range(3):
+        try:
+            # Own key per import, lowest priority: single /play requests go first and keep their per-chat slots
+            async with admission.slot(("import", chat_id), PRIORITY_IMPORT):
+                with extractor.reservation():
+                    video = await get_youtube_video(f"{song['title']} {song['artist']}")
+            break
+        except (AdmissionRejected, ExtractionQueueFull):
+            await asyncio.sleep(1 + attempt)
+    else:
+        return None
+    if not video:
+        return None
+    track_index.add(track["id"], video)
+    if (video.get("duration") or 0) > MAX_TRACK_DURATION:
+        return None
+    return queue_item_from_video(video)
+
+async def start_playlist_import(message, kind, collection_id):
+    chat_id = message.chat.id
+    if not sp:
+        return await message.reply_text("⚠️ *स्पॉटिफाई कॉन्फ़िगर नहीं है।*")
+    running = playlist_imports.get(chat_id)
+    if running and not running.done():
+        return await message.reply_text("⚠️ *इस ग्रुप में एक प्लेलिस्ट पहले से लोड हो रही है।*")
+
+    with stage("telegram_reply"):
+        await message.delete()
+        status_msg = await message.reply_text("📥 *प्लेलिस्ट लोड हो रही है...*")
+
+    async def report(job, finished):
+        header = "✅ **प्लेलिस्ट लोड हो गई**" if finished else "📥 **प्लेलिस्ट लोड हो रही है...**"
+        await status_msg.edit(
+            f"{header}\n\n"
+            f"🎵 कतार में जोड़े गए: `{job.queued}/{job.total}`\n"
+            f"⏭️ छोड़े गए: `{job.skipped}`  🔁 डुप्लिकेट: `{job.duplicates}`"
+            + ("\n⚠️ *पूरी प्लेलिस्ट नहीं मिल सकी।*" if finished and job.error else "")
+        )
+
+    job = PlaylistImport(
+        sp.iter_collection(kind, collection_id, max_tracks=PLAYLIST_MAX_TRACKS),
+        lambda track: match_spotify_track(chat_id, track), lambda item: enqueue_item(chat_id, item),
+        workers=PLAYLIST_WORKERS, on_progress=report,
+        seen_ids={item["id"] for item in queue.get(chat_id, [])}
+    )
+    # Runs in its own task so the handler returns and the import can be cancelled by .stop
+    playlist_imports[chat_id] = asyncio.create_task(run_playlist_import(chat_id, job, status_msg))
+
+async def run_playlist_import(chat_id, job, status_msg):
+    try:
+        await job.run()
+        logger.info(f"📥 Imported {job.queued}/{job.total} Spotify tracks into {chat_id}")
+    except asyncio.CancelledError:
+        await status_msg.edit(f"🛑 *प्लेलिस्ट लोड करना रोका गया ({job.queued} गाने जोड़े गए)।*")
+    except Exception as e:
+        logger.error(f"Playlist Import Error in {chat_id}: {e}")
+        await status_msg.edit("⚠️ *प्लेलिस्ट लोड करने में त्रुटि हुई। कृपया बाद में पुनः प्रयास करें।*")
+    finally:
+        if playlist_imports.get(chat_id) is asyncio.current_task():
+            del playlist_imports[chat_id]
+
+def cancel_playlist_import(chat_id):
+    task = playlist_imports.pop(chat_id, None)
+    if task and not task.done():
+        task.cancel()
+
+# 📻 Radio: station list (with last health probe) and playback
+@app.on_callback_query(filters.regex("^radio$"))
+async def radio_callback(client, callback_query):
+    buttons = [
+        [InlineKeyboardButton(f"{'🟢' if relay_hub.is_healthy(url) else '🔴'} {name}", callback_data=f"radio_play_{i}")]
+        for i, (name, url) in enumerate(FM_CHANNELS.items())
+    ]
+    buttons.append([InlineKeyboardButton("🔙 वापस", callback_data="back_to_start")])
+    await callback_query.edit_message_text(
+        "📻 **रेडियो स्टेशन**\n\n"
+        "ग्रुप में कोई स्टेशन चुनें, वह वॉइस चैट में लाइव चलेगा।\n"
+        "🔴 = स्टेशन अभी उपलब्ध नहीं है।",
+        reply_markup=InlineKeyboardMarkup(buttons)
     )
 
+@app.on_callback_query(filters.regex(r"^radio_play_\d+$"))
+async def radio_play_callback(client, callback_query):
+    chat = callback_query.message.chat
+    user = callback_query.from_user
+    if chat.type not in ("group", "supergroup"):
+        return await callback_query.answer("⚠️ रेडियो केवल ग्रुप की वॉइस चैट में चलाया जा सकता है।", show_alert=True)
+    if not await is_group_allowed(chat.id):
+        return await callback_query.answer("⚠️ यह ग्रुप बॉट का उपयोग करने के लिए अधिकृत नहीं है।", show_alert=True)
+    if maintenance_mode and user.id != OWNER_ID:
+        return await callback_query.answer("⚠️ बॉट वर्तमान में मेन्टेनेंस मोड में है।", show_alert=True)
+    if not await is_admin_and_allowed(chat.id, user.id, "play"):
+        return await callback_query.answer("⚠️ केवल एडमिन इस बटन का उपयोग कर सकते हैं!", show_alert=True)
+
+    stations = list(FM_CHANNELS.items())
+    index = int(callback_query.data.rsplit("_", 1)[1])
+    if index >= len(stations):
+        return await callback_query.answer("⚠️ यह स्टेशन अब उपलब्ध नहीं है।", show_alert=True)
+    name, url = stations[index]
+    if not relay_hub.is_healthy(url):
+        return await callback_query.answer(f"⚠️ {name} अभी उपलब्ध नहीं है। कृपया बाद में पुनः प्रयास करें।", show_alert=True)
+
+    # The station replaces whatever is playing in this chat
+    cancel_playlist_import(chat.id)
+    await playback.stop(chat.id)
+    try:
+        await enqueue_item(chat.id, make_queue_item(relay_source(url), f"📻 {name}", "radio", 0))
+    except Exception as e:
+        logger.error(f"Radio Play Error: {e}")
+        return await callback_query.answer("⚠️ रेडियो शुरू करने में त्रुटि हुई। कृपया बाद में पुनः प्रयास करें।", show_alert=True)
+    await callback_query.answer(f"📻 {name} चल रहा है")
+
+# ✅ Owner Commands: .addradio <name> | <url>, .removeradio <name>
+@app.on_message(filters.command("addradio", prefixes=".") & filters.user(OWNER_ID))
+async def add_radio_command(client, message: Message):
+    name, _, url = " ".join(message.command[1:]).partition("|")
+    name, url = name.strip(), url.strip()
+    if not name or not url.startswith(("http://", "https://")):
+        return await message.reply_text("⚠️ *उपयोग:* `.addradio <नाम> | <stream URL>`")
+    if not await relay_hub.probe(url):
+        return await message.reply_text("⚠️ *यह स्ट्रीम अभी जवाब नहीं दे रही है।*")
+    FM_CHANNELS[name] = url
+    await save_fm_channels()
+    await message.reply_text(f"✅ *रेडियो स्टेशन `{name}` जोड़ा गया!*")
+
+@app.on_message(filters.command("removeradio", prefixes=".") & filters.user(OWNER_ID))
+async def remove_radio_command(client, message: Message):
+    name = " ".join(message.command[1:]).strip()
+    if FM_CHANNELS.pop(name, None) is None:
+        return await message.reply_text("⚠️ *यह स्टेशन सूची में नहीं है।*")
+    await save_fm_channels()
+    await message.reply_text(f"✅ *रेडियो स्टेशन `{name}` हटाया गया!*")
+
 # ✅ Expand Callback
 @app.on_callback_query(filters.regex("^expand$"))
 async def expand_callback(client, callback_query):
@@ -365,50 +1098,133 @@ async def collapse_callback(client, callback_query):
 
 # 🎵 Stop Command (Admin Check)
 @app.on_message(filters.command("stop", prefixes=".") & filters.group)
+@timed_command("stop")
 async def stop(client, message: Message):
-    global is_call_active
     chat_id = message.chat.id
     user = message.from_user
 
     if not await is_admin_and_allowed(chat_id, user.id, "stop"):
         return await message.reply_text("⚠️ *केवल एडमिन इस कमांड का उपयोग कर सकते हैं!*")
 
-    async with queue_lock:
-        queue.pop(chat_id, None)
-        await save_queue()
-
-    if is_call_active:
-        await call_py.leave_group_call(chat_id)
-        is_call_active = False
+    cancel_playlist_import(chat_id)
+    await playback.stop(chat_id)
     await message.reply_text("🛑 *प्लेबैक रोक दिया गया है।*")
 
+# ⏯️ Pause/Resume/Skip Commands (Admin Check)
+@app.on_message(filters.command(["pause", "resume", "skip"], prefixes=".") & filters.group)
+async def playback_control_command(client, message: Message):
+    chat_id = message.chat.id
+    command = message.command[0].lower()
+
+    if not await is_admin_and_allowed(chat_id, message.from_user.id, command):
+        return await message.reply_text("⚠️ *केवल एडमिन इस कमांड का उपयोग कर सकते हैं!*")
+
+    await message.reply_text(await run_playback_control(chat_id, command))
+
+# ⏯️ Player Control Buttons
+@app.on_callback_query(filters.regex("^(pause|resume|skip|stop)$"))
+async def playback_control_callback(client, callback_query):
+    chat_id = callback_query.message.chat.id
+    command = callback_query.data
+
+    if not await is_admin_and_allowed(chat_id, callback_query.from_user.id, command):
+        return await callback_query.answer("⚠️ केवल एडमिन इस बटन का उपयोग कर सकते हैं!", show_alert=True)
+
+    await callback_query.answer(await run_playback_control(chat_id, command))
+
+async def run_playback_control(chat_id, command):
+    try:
+        if command == "pause":
+            if not await playback.pause(chat_id):
+                return "⚠️ कुछ भी नहीं चल रहा है।"
+            outbox.touch(chat_id)
+            return "⏸️ प्लेबैक पॉज़ किया गया।"
+        if command == "resume":
+            if not await playback.resume(chat_id):
+                return "⚠️ कुछ भी पॉज़ नहीं है।"
+            outbox.touch(chat_id)
+            return "▶️ प्लेबैक रिज्यूम किया गया।"
+        if command == "skip":
+            item = await playback.advance(chat_id)
+            return f"⏭️ अब चल रहा है: {item['title']}" if item else "⏹️ कतार खत्म, प्लेबैक रोक दिया गया।"
+        cancel_playlist_import(chat_id)
+        await playback.stop(chat_id)
+        return "🛑 प्लेबैक रोक दिया गया है।"
+    except Exception as e:
+        logger.error(f"Playback Control Error: {e}")
+        return "⚠️ एक त्रुटि हुई। कृपया बाद में पुनः प्रयास करें।"
+
+# ✅ Auto-advance when a track ends; clean up when the call goes away
+@call_py.on_stream_end()
+async def stream_end_handler(client, update):
+    chat_id = update.chat_id
+    # The live now-playing message follows the new track; nothing new is posted
+    try:
+        await playback.advance(chat_id)
+    except Exception as e:
+        logger.error(f"Auto-Advance Error in {chat_id}: {e}")
+
+@call_py.on_kicked()
+@call_py.on_closed_voice_chat()
+async def call_closed_handler(client, chat_id):
+    cancel_playlist_import(chat_id)
+    playback.forget(chat_id)
+
+async def rejoin_chats(chat_ids):
+    """A shard worker died: re-join its calls (from the current track) on the remaining workers."""
+    for chat_id in chat_ids:
+        session = sessions.peek(chat_id)
+        if session is None or not session.is_call_active:
+            continue
+        try:
+            async with session.lock:
+                if sessions.peek(chat_id) is not session:
+                    continue  # stopped while we waited
+                await playback.rejoin(session)
+        except Exception as e:
+            logger.error(f"❌ Rejoin Error in {chat_id}: {e}")
+            playback.forget(chat_id)
+
 # ✅ Owner Commands: Enable/Disable Admin Commands
 @app.on_message(filters.command("enableadmin", prefixes=".") & filters.user(OWNER_ID))
 async def enable_admin_command(client, message: Message):
     cmd = message.text.split(" ", 1)[1].strip()
-    async with aiofiles.open("admin_commands.json", "r+") as f:
-        data = json.loads(await f.read())
-        if cmd not in data["allowed_admin_commands"]:
-            data["allowed_admin_commands"].append(cmd)
-            await f.seek(0)
-            await f.write(json.dumps(data))
-            return await message.reply_text(f"✅ *एडमिन कमांड `{cmd}` सक्षम की गई!*")
+    if cmd not in allowed_admin_commands:
+        allowed_admin_commands.add(cmd)
+        await save_admin_commands()
+        return await message.reply_text(f"✅ *एडमिन कमांड `{cmd}` सक्षम की गई!*")
 
 @app.on_message(filters.command("disableadmin", prefixes=".") & filters.user(OWNER_ID))
 async def disable_admin_command(client, message: Message):
     cmd = message.text.split(" ", 1)[1].strip()
-    async with aiofiles.open("admin_commands.json", "r+") as f:
-        data = json.loads(await f.read())
-        if cmd in data["allowed_admin_commands"]:
-            data["allowed_admin_commands"].remove(cmd)
-            await f.seek(0)
-            await f.write(json.dumps(data))
-            return await message.reply_text(f"✅ *एडमिन कमांड `{cmd}` अक्षम की गई!*")
+    if cmd in allowed_admin_commands:
+        allowed_admin_commands.discard(cmd)
+        await save_admin_commands()
+        return await message.reply_text(f"✅ *एडमिन कमांड `{cmd}` अक्षम की गई!*")
+
+# ✅ Drop cached member status when it changes (promote/demote/leave)
+@app.on_chat_member_updated()
+async def chat_member_updated_handler(client, update):
+    member = update.new_chat_member or update.old_chat_member
+    if member and member.user:
+        admin_status_cache.pop((update.chat.id, member.user.id), None)
+
+# ✅ Owner Commands: Authorize/Remove Groups
+@app.on_message(filters.command("addgroup", prefixes=".") & filters.user(OWNER_ID) & filters.group)
+async def add_group_command(client, message: Message):
+    add_allowed_group(message.chat.id)
+    await message.reply_text("✅ *यह ग्रुप बॉट का उपयोग करने के लिए अधिकृत किया गया!*")
+
+@app.on_message(filters.command("removegroup", prefixes=".") & filters.user(OWNER_ID) & filters.group)
+async def remove_group_command(client, message: Message):
+    remove_allowed_group(message.chat.id)
+    await message.reply_text("✅ *इस ग्रुप की अनुमति हटा दी गई है।*")
 
 # 🎥 Play Video Command (Owner Only)
 @app.on_message(filters.command("playvideo", prefixes=".") & filters.user(OWNER_ID))
+@timed_command("playvideo")
+@admitted
 async def play_video_command(client, message: Message):
-    global is_call_active
     chat_id = message.chat.id
     user = message.from_user
 
@@ -421,59 +1237,56 @@ async def play_video_command(client, message: Message):
     if not video_url:
         return await message.reply_text("⚠️ *कृपया वीडियो URL दर्ज करें!*")
 
-    await message.delete()
-    searching_msg = await message.reply_text("🔍 *वीडियो प्रोसेस किया जा रहा है...*")
+    with stage("telegram_reply"):
+        await message.delete()
+        searching_msg = await message.reply_text("🔍 *वीडियो प्रोसेस किया जा रहा है...*")
 
     try:
-        # Use yt-dlp to extract video info
-        loop = asyncio.get_event_loop()
-        with youtube_dl.YoutubeDL(ydl_opts) as ydl:
-            info = await loop.run_in_executor(None, lambda: ydl.extract_info(video_url, download=False))
-            if not info:
-                return await searching_msg.edit("⚠️ *दिए गए URL पर कोई वीडियो नहीं मिला।*")
-
-            video_title = info.get("title", "Unknown Title")
-            video_url = info.get("url")  # Direct video stream URL
-            video_duration = info.get("duration", 0)
-
-            # Check video duration (max 3 hours = 180 minutes = 10800 seconds)
-            if video_duration > 10800:
-                return await searching_msg.edit("⚠️ *वीडियो बहुत लंबा है। अधिकतम अनुमत अवधि 3 घंटे है।*")
-
-    except DownloadError:
+        # Use the yt-dlp pool; deleting the status message cancels the job
+        with extractor.reservation():
+            info = await extractor.extract(video_url, job_key=(chat_id, searching_msg.message_id))
+        if not info:
+            return await searching_msg.edit("⚠️ *दिए गए URL पर कोई वीडियो नहीं मिला।*")
+
+        video_title = info.get("title", "Unknown Title")
+        video_duration = info.get("duration") or 0
+        # Queue the page URL (stable); the direct stream URL is resolved lazily
+        item = make_queue_item(info.get("webpage_url") or video_url, video_title, "video", video_duration)
+        resolver.prime(item["source"], info.get("url"))
+
+        # Check video duration (max 3 hours = 180 minutes = 10800 seconds)
+        if video_duration > 10800:
+            return await searching_msg.edit("⚠️ *वीडियो बहुत लंबा है। अधिकतम अनुमत अवधि 3 घंटे है।*")
+
+    except ExtractionCancelled:
+        logger.info(f"Video extraction cancelled in {chat_id}")
+        return
+    except ExtractionQueueFull:
+        return await searching_msg.edit("⚠️ *बॉट अभी व्यस्त है। कृपया थोड़ी देर बाद पुनः प्रयास करें।*")
+    except asyncio.TimeoutError:
+        return await searching_msg.edit("⚠️ *वीडियो प्रोसेस करने में बहुत समय लगा। कृपया बाद में पुनः प्रयास करें।*")
+    except ExtractionFailed:
         return await searching_msg.edit("⚠️ *अमान्य URL या असमर्थित वेबसाइट।*")
     except Exception as e:
         logger.error(f"Video Play Error: {e}")
         return await searching_msg.edit("⚠️ *एक त्रुटि हुई। कृपया बाद में पुनः प्रयास करें।*")
 
-    await searching_msg.delete()
-
-    # Add video to queue
-    async with queue_lock:
-        queue.setdefault(chat_id, []).append((video_url, video_title, "video"))
-        await save_queue()
+    with stage("telegram_reply"):
+        await searching_msg.delete()
 
-    # Join voice call if not already joined
-    if not is_call_active:
-        await call_py.join_group_call(
-            chat_id,
-            AudioPiped(video_url, stream_type=StreamType().pulse_stream)
-        )
-        is_call_active = True
+    # Add video to this chat's queue and join its voice call if not already joined
+    try:
+        await enqueue_item(chat_id, item)
+    except Exception as e:
+        logger.error(f"Video Play Error: {e}")
+        return await message.reply_text("⚠️ *एक त्रुटि हुई। कृपया बाद में पुनः प्रयास करें।*")
 
-    # Send now playing message
-    await message.reply_text(
-        f"🎥 **अभी चल रहा वीडियो:** `{video_title}`\n"
-        f"🔗 [वीडियो देखें]({video_url})\n\n"
-        "🎧 *Rola Vibe का आनंद लें!*",
-        reply_markup=InlineKeyboardMarkup([
-            [InlineKeyboardButton("⏸️ पॉज़", callback_data="pause"),
-             InlineKeyboardButton("▶️ रिज्यूम", callback_data="resume"),
-             InlineKeyboardButton("⏭️ स्किप", callback_data="skip"),
-             InlineKeyboardButton("⏹️ रोकें", callback_data="stop")],
-            [InlineKeyboardButton("🔍 विस्तार करें", callback_data="expand")]
-        ])
-    )
+# ✅ Cancel pending extractions when their status message is deleted
+@app.on_deleted_messages()
+async def deleted_messages_handler(client, messages):
+    for deleted in messages:
+        if deleted.chat:
+            extractor.cancel((deleted.chat.id, deleted.message_id))
 
 # ✅ Owner Panel Callback
 @app.on_callback_query(filters.regex("^owner_panel$"))
@@ -510,14 +1323,23 @@ async def bot_stats_callback(client, callback_query):
         await callback_query.answer("⚠️ केवल बॉट ओनर इस पैनल तक पहुंच सकते हैं!", show_alert=True)
         return
 
-    # ✅ Fetch Bot Stats (Example)
-    total_users = 1000  # Replace with actual logic to fetch stats
-    total_groups = 50   # Replace with actual logic to fetch stats
+    # ✅ Live stats from the in-memory store (no history scan)
+    summary = bot_stats.summary()
+    hits = cache.stats["memory_hits"] + cache.stats["disk_hits"]
+    lookups = hits + cache.stats["misses"]
+    hit_rate = f"{hits / lookups * 100:.1f}%" if lookups else "—"
+    top = "\n".join(
+        f"{i}. {title} — `{plays}`" for i, (plays, title) in enumerate(bot_stats.top_tracks(5), 1)
+    ) or "—"
 
     await callback_query.edit_message_text(
         f"📊 **बॉट स्टैटिस्टिक्स**\n\n"
-        f"👤 कुल यूजर्स: `{total_users}`\n"
-        f"👥 कुल ग्रुप्स: `{total_groups}`\n\n"
+        f"👤 कुल यूजर्स: `~{summary['users']}`\n"
+        f"👥 कुल ग्रुप्स: `~{summary['groups']}`\n"
+        f"🎵 कुल प्ले: `{summary['total_plays']}` ({summary['active_chats']} चैट्स में)\n"
+        f"🔊 अभी चल रहे कॉल: `{len(sessions.active())}`\n"
+        f"⚡ कैश हिट रेट: `{hit_rate}`\n\n"
+        f"🔥 **टॉप गाने:**\n{top}\n\n"
         "🔙 वापस जाने के लिए नीचे दिए गए बटन पर क्लिक करें।",
         reply_markup=InlineKeyboardMarkup([
             [InlineKeyboardButton("🔙 वापस", callback_data="owner_panel")]
@@ -527,21 +1349,91 @@ async def bot_stats_callback(client, callback_query):
 # ✅ Broadcast Message Callback
 @app.on_callback_query(filters.regex("^broadcast$"))
 async def broadcast_callback(client, callback_query):
+    global awaiting_broadcast
     user = callback_query.from_user
 
     if user.id != OWNER_ID:
         await callback_query.answer("⚠️ केवल बॉट ओनर इस पैनल तक पहुंच सकते हैं!", show_alert=True)
         return
 
+    if broadcaster.running:
+        state = broadcaster.state
+        await callback_query.answer(
+            f"📢 ब्रॉडकास्ट चल रहा है: {state['sent'] + state['failed']}/{len(state['chat_ids'])}",
+            show_alert=True
+        )
+        return
+
+    awaiting_broadcast = True
     await callback_query.edit_message_text(
         "📢 **ब्रॉडकास्ट मैसेज**\n\n"
-        "वह मैसेज भेजें जिसे आप सभी यूजर्स/ग्रुप्स को ब्रॉडकास्ट करना चाहते हैं।\n\n"
+        "वह मैसेज मुझे प्राइवेट चैट में भेजें जिसे आप सभी यूजर्स/ग्रुप्स को ब्रॉडकास्ट करना चाहते हैं।\n"
+        f"📬 कुल चैट्स: `{len(chat_directory.chat_ids)}`\n\n"
         "🔙 वापस जाने के लिए नीचे दिए गए बटन पर क्लिक करें।",
         reply_markup=InlineKeyboardMarkup([
             [InlineKeyboardButton("🔙 वापस", callback_data="owner_panel")]
         ])
     )
 
+# ✅ Owner: the next private message after the broadcast button is the broadcast
+@app.on_message(filters.private & filters.user(OWNER_ID), group=1)
+async def broadcast_message_handler(client, message: Message):
+    global awaiting_broadcast
+    if not awaiting_broadcast or (message.text or "").startswith((".", "/")):
+        return
+    awaiting_broadcast = False
+    await start_broadcast(client, message)
+
+# ✅ Owner Command: .broadcast (reply to a message) | .broadcast cancel
+@app.on_message(filters.command("broadcast", prefixes=".") & filters.user(OWNER_ID))
+async def broadcast_command(client, message: Message):
+    global awaiting_broadcast
+    args = message.command[1:]
+    if args and args[0].lower() == "cancel":
+        awaiting_broadcast = False
+        if await broadcaster.stop(discard=True):
+            await message.reply_text("🛑 *ब्रॉडकास्ट रद्द कर दिया गया।*")
+        else:
+            await message.reply_text("⚠️ *कोई ब्रॉडकास्ट नहीं चल रहा है।*")
+        return
+    if not message.reply_to_message:
+        return await message.reply_text("⚠️ *उपयोग:* किसी मैसेज का रिप्लाई करके `.broadcast` भेजें।")
+    await start_broadcast(client, message.reply_to_message)
+
+def broadcast_progress(status_message):
+    async def report(sent, failed, total, finished):
+        header = "✅ **ब्रॉडकास्ट पूरा हुआ**" if finished else "📢 **ब्रॉडकास्ट जारी है...**"
+        await status_message.edit_text(
+            f"{header}\n\n"
+            f"📬 भेजे गए: `{sent}`\n"
+            f"❌ विफल: `{failed}`\n"
+            f"📊 प्रगति: `{sent + failed}/{total}`"
+        )
+    return report
+
+async def start_broadcast(client, source: Message):
+    if broadcaster.running:
+        return await source.reply_text("⚠️ *एक ब्रॉडकास्ट पहले से चल रहा है।* रद्द करने के लिए `.broadcast cancel` भेजें।")
+    chat_ids = [chat_id for chat_id in chat_directory.chat_ids if chat_id != source.chat.id]
+    status_message = await source.reply_text(f"📢 *{len(chat_ids)} चैट्स में ब्रॉडकास्ट शुरू हो रहा है...*")
+    broadcaster.start(source.chat.id, source.message_id, chat_ids, on_progress=broadcast_progress(status_message))
+    logger.info(f"📢 Broadcast started to {len(chat_ids)} chats")
+
+async def resume_broadcast(client):
+    state = await broadcaster.load_unfinished()
+    if not state:
+        return
+    remaining = len(state["chat_ids"]) - state["cursor"]
+    try:
+        status_message = await client.send_message(
+            OWNER_ID, f"📢 *अधूरा ब्रॉडकास्ट फिर से शुरू हो रहा है ({remaining} चैट्स बाकी)...*"
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ Broadcast resume notice failed: {e}")
+        status_message = None
+    broadcaster.resume(state, on_progress=broadcast_progress(status_message) if status_message else None)
+    logger.info(f"📢 Broadcast resumed with {remaining} chats remaining")
+
 # ✅ Maintenance Mode Callback
 @app.on_callback_query(filters.regex("^maintenance$"))
 async def maintenance_callback(client, callback_query):
@@ -573,8 +1465,8 @@ async def admin_commands_callback(client, callback_query):
         await callback_query.answer("⚠️ केवल बॉट ओनर इस पैनल तक पहुंच सकते हैं!", show_alert=True)
         return
 
-    # ✅ Fetch Admin Commands (Example)
-    admin_commands = [".play", ".stop", ".pause", ".resume", ".skip"]
+    # ✅ Admin Commands from the in-memory ACL
+    admin_commands = [f".{cmd}" for cmd in sorted(allowed_admin_commands)]
 
     await callback_query.edit_message_text(
         f"🔒 **एडमिन कमांड्स मैनेजमेंट**\n\n"
@@ -595,18 +1487,44 @@ async def check_logs_callback(client, callback_query):
         await callback_query.answer("⚠️ केवल बॉट ओनर इस पैनल तक पहुंच सकते हैं!", show_alert=True)
         return
 
-    # ✅ Send Logs File (Example)
+    # ✅ Send only the recent tail of the log, not the whole file
+    if await send_log_tail(client, user.id, LOG_TAIL_MINUTES, "INFO"):
+        await callback_query.answer("लॉग्स आपके प्राइवेट चैट में भेजे गए हैं।", show_alert=True)
+    else:
+        await callback_query.answer("⚠️ लॉग्स भेजने में विफल। कृपया लॉग फ़ाइल मैन्युअल रूप से जांचें।", show_alert=True)
+
+# ✅ Owner Command: .logs [minutes] [level] [module]
+@app.on_message(filters.command("logs", prefixes=".") & filters.user(OWNER_ID))
+async def logs_command(client, message: Message):
+    args = message.command[1:]
+    try:
+        minutes = int(args[0]) if args else LOG_TAIL_MINUTES
+    except ValueError:
+        return await message.reply_text("⚠️ *उपयोग:* `.logs [मिनट] [LEVEL] [module]`")
+    level = args[1] if len(args) > 1 else "INFO"
+    module = args[2] if len(args) > 2 else None
+    if not await send_log_tail(client, message.chat.id, minutes, level, module):
+        await message.reply_text("⚠️ *चुने गए समय में कोई लॉग नहीं मिला।*")
+
+async def send_log_tail(client, chat_id, minutes, level, module=None):
+    loop = asyncio.get_running_loop()
     try:
+        text = await loop.run_in_executor(
+            None, lambda: tail_log(LOG_FILE, LOG_TAIL_LINES, minutes * 60, level, module)
+        )
+        if not text:
+            return False
+        document = io.BytesIO(text.encode("utf-8"))
+        document.name = "rolavibe-tail.log"
         await client.send_document(
-            chat_id=user.id,
-            document="rolavibe.log",
-            caption="📝 **बॉट लॉग्स**\n\nयहां नवीनतम लॉग्स हैं।"
+            chat_id=chat_id,
+            document=document,
+            caption=f"📝 **बॉट लॉग्स**\n\nपिछले {minutes} मिनट, `{level.upper()}`+ (अधिकतम {LOG_TAIL_LINES} लाइनें)।"
         )
+        return True
     except Exception as e:
         logger.error(f"Logs Send Error: {e}")
-        await callback_query.answer("⚠️ लॉग्स भेजने में विफल। कृपया लॉग फ़ाइल मैन्युअल रूप से जांचें।", show_alert=True)
-
-    await callback_query.answer("लॉग्स आपके प्राइवेट चैट में भेजे गए हैं।", show_alert=True)
+        return False
 
 # ✅ Back to Start Callback
 @app.on_callback_query(filters.regex("^back_to_start$"))
@@ -658,18 +1576,125 @@ async def handle_ai_functionality():
         # Normal bot functionality
         pass
 
+# ✅ Startup (every phase is timed; independent phases run side by side)
+STARTUP_WARM_TRACKS = int(os.environ.get("ROLA_STARTUP_WARM_TRACKS", "20"))
+startup_timings = {}  # phase -> seconds
+
+async def timed_phase(name, awaitable):
+    started = time.monotonic()
+    try:
+        return await awaitable
+    finally:
+        startup_timings[name] = time.monotonic() - started
+
+async def start_clients():
+    if SHARD_WORKERS:
+        # Shard workers log in with their own assistant accounts, so they do not wait for the bot
+        await asyncio.gather(timed_phase("telegram", app.start()), timed_phase("voice", call_py.start()))
+    else:
+        # PyTgCalls runs on the bot's client and needs it connected first
+        await timed_phase("telegram", app.start())
+        await timed_phase("voice", call_py.start())
+
+async def warm_caches():
+    """Resolve the stream URLs most likely to be needed first: restored queue heads, then top tracks."""
+    started = time.monotonic()
+    sources = [items[0]["source"] for items in list(queue.values()) if items]
+    # Top track keys are video IDs for YouTube songs and source URLs for everything else
+    sources += [youtube_source(key) for key in bot_stats.top_track_keys(STARTUP_WARM_TRACKS) if "/" not in key and ":" not in key]
+    pending = [
+        source for source in dict.fromkeys(sources)
+        if not is_relay_source(source) and not track_store.has(source) and not resolver.fresh_url(source)
+    ]
+    # One batch per worker count, so play requests arriving meanwhile still find free workers
+    for i in range(0, len(pending), extractor.workers):
+        batch = pending[i:i + extractor.workers]
+        await asyncio.gather(*(resolver.resolve(source) for source in batch), return_exceptions=True)
+    startup_timings["warm_caches"] = time.monotonic() - started
+    logger.info(f"🔥 Warmed {len(pending)} stream URLs in {startup_timings['warm_caches']:.1f}s")
+
+async def build_suggestions():
+    """Fill the inline search index from the newest resolved tracks, with play counts for ranking."""
+    started = time.monotonic()
+    for i, video in enumerate(track_index.recent(suggestions.max_entries)):
+        suggestions.add(video["id"], video["title"], video["duration"])
+        if i % 1000 == 999:
+            await asyncio.sleep(0)  # let handlers run while the index builds
+    for key, (plays, title) in list(bot_stats.tracks.items()):
+        if "/" not in key and ":" not in key:
+            suggestions.add(key, title, plays=plays)
+    startup_timings["suggestions"] = time.monotonic() - started
+    logger.info(f"🔎 Inline search index ready: {len(suggestions)} tracks in {startup_timings['suggestions']:.1f}s")
+
 # 🔥 Run Bot
 async def main():
+    global call_py_started
+    web_runner = None
+    background_tasks = []
+    started = time.monotonic()
     try:
+        # 1. State from disk; the files are independent, so they are read concurrently
         await ensure_files_exist()
-        await load_queue()
-        await load_fm_channels()
-        await load_maintenance_mode()
-        await app.start()
-        await call_py.start()
+        relay_hub.remove_stale_fifos()
+        await timed_phase("state", asyncio.gather(
+            load_queue(), load_fm_channels(), load_maintenance_mode(), load_admin_commands(),
+            load_allowed_groups(), track_store.load(), bot_stats.load(), chat_directory.load(),
+            track_index.load()
+        ))
+
+        # 2. Probes come up first and report 503 until everything below is ready
+        web_runner = await timed_phase("keep_alive", start_keep_alive())
+        background_tasks.append(asyncio.create_task(monitor_loop_lag()))
+
+        # 3. Extraction workers (which import yt-dlp) come up alongside Telegram and voice calls
+        await asyncio.gather(timed_phase("extractor", extractor.start()), start_clients())
+        call_py_started = True
+
+        background_tasks.append(asyncio.create_task(watch_allowed_groups()))
+        background_tasks.append(asyncio.create_task(cache.run_eviction()))
+        background_tasks.append(asyncio.create_task(bot_stats.run_flusher()))
+        background_tasks.append(asyncio.create_task(chat_directory.run_flusher()))
+        track_index.start()
+        background_tasks.append(asyncio.create_task(outbox.run_ticker(
+            lambda: [s.chat_id for s in sessions.active() if not s.paused], NOW_PLAYING_REFRESH
+        )))
+        background_tasks.append(asyncio.create_task(
+            relay_hub.run_health_checks(lambda: list(FM_CHANNELS.values()), RADIO_HEALTH_INTERVAL)
+        ))
+        await resume_broadcast(app)
+
+        # 4. Commands are served from here on; suggestions and the stream URL cache fill behind them
+        background_tasks.append(asyncio.create_task(build_suggestions()))
+        background_tasks.append(asyncio.create_task(warm_caches()))
+        startup_timings["total"] = time.monotonic() - started
+        breakdown = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in startup_timings.items() if phase != "total")
+        logger.info(f"✅ Rola Vibe is ready in {startup_timings['total']:.2f}s ({breakdown})")
         await idle()
     except Exception as e:
         logger.error(f"❌ Bot Startup Error: {e}")
+    finally:
+        # Shut down in reverse order: stop answering probes, persist, then disconnect
+        logger.info("🛑 Shutting down...")
+        call_py_started = False
+        await stop_keep_alive(web_runner)
+        for task in background_tasks:
+            task.cancel()
+        await queue_store.close(queue)
+        for chat_id in list(playlist_imports):
+            cancel_playlist_import(chat_id)
+        await broadcaster.stop()
+        await relay_hub.close()
+        if SHARD_WORKERS:
+            await call_py.stop()
+        await bot_stats.flush()
+        await chat_directory.flush()
+        await track_index.close()
+        if app.is_connected:
+            await app.stop()
+        extractor.shutdown()
+        if sp:
+            await sp.close()
+        stop_logging()
 
 if __name__ == "__main__":
     asyncio.run(main())
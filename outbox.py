@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from pyrogram.errors import FloodWait, RPCError
+from pyrogram.types import InputMediaPhoto
+
+logger = logging.getLogger(__name__)
+
+
+def _flood_seconds(error):
+    return getattr(error, "value", None) or getattr(error, "x", 1)
+
+
+def _not_modified(error):
+    return "MESSAGE_NOT_MODIFIED" in str(error)
+
+
+class _Lane:
+    """Outbound state of one chat's live now-playing message."""
+
+    __slots__ = ("chat_id", "message_id", "has_photo", "shown", "dirty", "next_allowed", "task")
+
+    def __init__(self, chat_id):
+        self.chat_id = chat_id
+        self.message_id = None
+        self.has_photo = False
+        self.shown = None  # (photo, caption, markup) as Telegram has it
+        self.dirty = False
+        self.next_allowed = 0
+        self.task = None
+
+
+class Outbox:
+    """Per-chat scheduler for the one live now-playing message.
+
+    Callers only ``touch(chat_id)``. The lane's flusher renders the chat's
+    current state when it is its turn, so any number of touches between two
+    API calls collapse into one edit. Each chat gets at most one edit every
+    ``min_interval`` seconds, and longer after a FloodWait. Nothing is sent
+    when the rendered content is unchanged. Thumbnails are sent by URL once
+    and by their cached Telegram ``file_id`` after that.
+    ``render(chat_id)`` returns ``(photo, caption, markup)`` or ``None``.
+    When the chat is forgotten, its message is edited to ``closing_text``
+    without buttons, so it no longer claims that something is playing.
+    """
+
+    def __init__(self, client, render, min_interval=2.0, max_file_ids=10000, closing_text=None):
+        self.client = client
+        self.render = render
+        self.closing_text = closing_text
+        self.min_interval = min_interval
+        self.max_file_ids = max_file_ids
+        self.file_ids = OrderedDict()  # thumbnail URL -> Telegram file_id
+        self._lanes = {}
+        self._closing = set()
+        self.stats = {"sent": 0, "edited": 0, "skipped": 0, "flood_waits": 0}
+
+    def touch(self, chat_id):
+        lane = self._lanes.get(chat_id)
+        if lane is None:
+            lane = self._lanes[chat_id] = _Lane(chat_id)
+        lane.dirty = True
+        if lane.task is None or lane.task.done():
+            lane.task = asyncio.ensure_future(self._flusher(lane))
+
+    def has_live_message(self, chat_id):
+        lane = self._lanes.get(chat_id)
+        return lane is not None and lane.message_id is not None
+
+    def active_chats(self):
+        return [chat_id for chat_id, lane in self._lanes.items() if lane.message_id is not None]
+
+    def forget(self, chat_id):
+        """Stop updating the chat's live message and close it; the next track posts a new one."""
+        lane = self._lanes.pop(chat_id, None)
+        if lane is None:
+            return
+        if lane.task:
+            lane.task.cancel()
+        if lane.message_id is not None and self.closing_text:
+            task = asyncio.ensure_future(self._close(lane))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    async def _close(self, lane):
+        for _ in range(3):
+            delay = lane.next_allowed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                if lane.has_photo:
+                    await self.client.edit_message_caption(lane.chat_id, lane.message_id, self.closing_text)
+                else:
+                    await self.client.edit_message_text(lane.chat_id, lane.message_id, self.closing_text)
+                return
+            except FloodWait as e:
+                self.stats["flood_waits"] += 1
+                lane.next_allowed = time.monotonic() + _flood_seconds(e)
+            except RPCError as e:
+                logger.info(f"Could not close now-playing message in {lane.chat_id}: {e}")
+                return
+
+    # ✅ Thumbnails
+    def _photo_ref(self, url):
+        file_id = self.file_ids.get(url)
+        if file_id:
+            self.file_ids.move_to_end(url)
+            return file_id
+        return url
+
+    def _remember_photo(self, url, message):
+        photo = getattr(message, "photo", None)
+        if url and photo and url not in self.file_ids:
+            self.file_ids[url] = photo.file_id
+            if len(self.file_ids) > self.max_file_ids:
+                self.file_ids.popitem(last=False)
+
+    # ✅ Flushing
+    async def _flusher(self, lane):
+        while lane.dirty:
+            delay = lane.next_allowed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            lane.dirty = False
+            try:
+                await self._apply(lane)
+            except FloodWait as e:
+                self.stats["flood_waits"] += 1
+                lane.next_allowed = time.monotonic() + _flood_seconds(e)
+                lane.dirty = True  # retry with whatever is current by then
+                continue
+            except Exception as e:
+                logger.warning(f"⚠️ Now-playing update failed in {lane.chat_id}: {e}")
+            lane.next_allowed = time.monotonic() + self.min_interval
+
+    async def _apply(self, lane):
+        view = self.render(lane.chat_id)
+        if view is None or view == lane.shown:
+            self.stats["skipped"] += 1
+            return
+        photo, caption, markup = view
+        chat_id = lane.chat_id
+        if lane.message_id is not None and bool(photo) != lane.has_photo:
+            # Text and photo messages cannot be turned into each other; replace it
+            old_id, lane.message_id = lane.message_id, None
+            try:
+                await self.client.delete_messages(chat_id, old_id)
+            except RPCError as e:
+                logger.info(f"Could not delete old now-playing message in {chat_id}: {e}")
+
+        if lane.message_id is None:
+            if photo:
+                message = await self.client.send_photo(
+                    chat_id, self._photo_ref(photo), caption=caption, reply_markup=markup
+                )
+                self._remember_photo(photo, message)
+            else:
+                message = await self.client.send_message(chat_id, caption, reply_markup=markup)
+            lane.message_id = message.message_id
+            lane.has_photo = bool(photo)
+            self.stats["sent"] += 1
+        else:
+            try:
+                if photo and (lane.shown is None or photo != lane.shown[0]):
+                    message = await self.client.edit_message_media(
+                        chat_id, lane.message_id, InputMediaPhoto(self._photo_ref(photo), caption=caption),
+                        reply_markup=markup
+                    )
+                    self._remember_photo(photo, message)
+                elif lane.has_photo:
+                    await self.client.edit_message_caption(chat_id, lane.message_id, caption, reply_markup=markup)
+                else:
+                    await self.client.edit_message_text(chat_id, lane.message_id, caption, reply_markup=markup)
+                self.stats["edited"] += 1
+            except FloodWait:
+                raise
+            except RPCError as e:
+                if not _not_modified(e):
+                    # Deleted by someone, too old to edit, ...: post a fresh one next time
+                    lane.message_id = None
+                    lane.dirty = True
+                    raise
+        lane.shown = view
+
+    async def run_ticker(self, chats, interval=20):
+        """Re-render ``chats()`` every ``interval`` seconds (progress bars)."""
+        while True:
+            await asyncio.sleep(interval)
+            for chat_id in chats():
+                if self.has_live_message(chat_id):
+                    self.touch(chat_id)
+
+
+class DeferredStatus:
+    """A "searching..." reply that is only sent if the work takes longer than ``delay``.
+
+    Fast requests (cache and index hits) never post it; slow ones see it
+    after ``delay`` seconds, then ``finish`` edits it or ``discard`` deletes it.
+    """
+
+    def __init__(self, message, text, delay=1.0):
+        self.message = message
+        self.text = text
+        self.sent = None
+        self._sending = False
+        self._timer = asyncio.ensure_future(self._send_later(delay))
+
+    async def _send_later(self, delay):
+        await asyncio.sleep(delay)
+        self._sending = True
+        try:
+            self.sent = await self.message.reply_text(self.text)
+        except Exception as e:
+            logger.warning(f"⚠️ Status message failed: {e}")
+
+    async def _settle(self):
+        # Once the reply is on its way, wait for it so it can be edited or deleted
+        if not self._sending:
+            self._timer.cancel()
+        await asyncio.gather(self._timer, return_exceptions=True)
+
+    async def finish(self, text):
+        """Show ``text`` as the outcome: edit the status if it was sent, else reply."""
+        await self._settle()
+        if self.sent is not None:
+            return await self.sent.edit(text)
+        return await self.message.reply_text(text)
+
+    async def discard(self):
+        await self._settle()
+        if self.sent is not None:
+            await self.sent.delete()
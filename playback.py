@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+from pytgcalls.types import StreamType
+from pytgcalls.types.input_stream import AudioPiped
+
+from metrics import stage, STAGE_SECONDS
+from relay import RELAY_PREFIX, RelayUnavailable, is_relay_source
+
+logger = logging.getLogger(__name__)
+
+
+def build_stream(stream_url):
+    return AudioPiped(stream_url, stream_type=StreamType().pulse_stream)
+
+
+class PlaybackEngine:
+    """Drives each chat's queue: joins, auto-advances on stream end, pause/resume/skip/stop.
+
+    ``queue[0]`` of a session is the track currently playing. While it plays,
+    the next entry is resolved and its input stream built ahead of time, so
+    a stream-end event only costs one ``change_stream`` call. Every
+    transition is timed and kept in ``gaps`` so the gap can be measured.
+    Relay sources (radio) are played through the shared ``relay`` decode.
+    They are never prepared ahead, because a chat has one subscription at a time.
+    """
+
+    def __init__(self, call_py, sessions, resolver, queue_store, prefetch_depth=2, gap_target=0.5,
+                 track_store=None, on_track_start=None, on_session_end=None, relay=None,
+                 stream_factory=build_stream):
+        self.call_py = call_py
+        self.sessions = sessions
+        self.resolver = resolver
+        self.queue_store = queue_store
+        self.track_store = track_store
+        self.on_track_start = on_track_start
+        self.on_session_end = on_session_end
+        self.relay = relay
+        self.stream_factory = stream_factory
+        self.prefetch_depth = prefetch_depth
+        self.gap_target = gap_target
+        self.gaps = deque(maxlen=1000)
+        self._next_inputs = {}  # chat_id -> (item, stream_url, input stream)
+        self._preparing = {}
+
+    # ✅ Preparation
+    async def _stream_url_for(self, item, chat_id):
+        """A locally stored copy wins over the remote stream."""
+        if self.relay and is_relay_source(item["source"]):
+            url = item["source"][len(RELAY_PREFIX):]
+            try:
+                return await self.relay.subscribe(url, chat_id)
+            except RelayUnavailable as e:
+                # The call decodes the stream itself, as it would without the relay
+                logger.warning(f"⚠️ {e}, streaming {url} directly in {chat_id}")
+                return url
+        if self.track_store:
+            local_path = self.track_store.local_path(item["source"])
+            if local_path:
+                return local_path
+        with stage("stream_resolve"):
+            return await self.resolver.resolve(item["source"])
+
+    def _still_valid(self, item, stream_url):
+        if not stream_url.startswith("http"):
+            return os.path.exists(stream_url)
+        return self.resolver.fresh_url(item["source"]) == stream_url
+
+    def _played(self, session, item):
+        relayed = is_relay_source(item["source"])
+        if self.relay and not relayed:
+            self.relay.unsubscribe(session.chat_id)
+        session.current = item
+        session.paused = False
+        session.started_at = time.monotonic()
+        session.paused_at = None
+        session.paused_total = 0
+        if self.track_store and not relayed:
+            self.track_store.record_play(item["source"])
+        if self.on_track_start:
+            self.on_track_start(session.chat_id, item)
+
+    def schedule_prepare(self, session):
+        """Prefetch upcoming URLs and build the next input; call with queue already updated."""
+        self.resolver.prefetch(session.queue[1:1 + self.prefetch_depth])
+        if len(session.queue) < 2 or session.chat_id in self._preparing:
+            return
+        if is_relay_source(session.queue[1]["source"]):
+            return
+        prepared = self._next_inputs.get(session.chat_id)
+        if prepared and prepared[0] is session.queue[1]:
+            return
+        self._preparing[session.chat_id] = asyncio.ensure_future(self._prepare_next(session))
+
+    async def _prepare_next(self, session):
+        try:
+            item = session.queue[1]
+            stream_url = await self._stream_url_for(item, session.chat_id)
+            if stream_url and len(session.queue) > 1 and session.queue[1] is item:
+                self._next_inputs[session.chat_id] = (item, stream_url, self.stream_factory(stream_url))
+        except Exception as e:
+            logger.warning(f"⚠️ Could not prepare next track in {session.chat_id}: {e}")
+        finally:
+            self._preparing.pop(session.chat_id, None)
+
+    def _take_prepared(self, chat_id, item):
+        prepared = self._next_inputs.pop(chat_id, None)
+        # Only use it if it is for this exact entry and its URL has not gone stale since
+        if prepared and prepared[0] is item and self._still_valid(item, prepared[1]):
+            return prepared[2]
+        return None
+
+    # ✅ Transitions (callers hold session.lock)
+    async def start(self, session):
+        """Join the call with ``queue[0]``; the caller has already appended it."""
+        item = session.queue[0]
+        stream_url = await self._stream_url_for(item, session.chat_id)
+        if not stream_url:
+            raise RuntimeError(f"Could not resolve {item['source']}")
+        with stage("join_call"):
+            await self.call_py.join_group_call(session.chat_id, self.stream_factory(stream_url))
+        session.is_call_active = True
+        self._played(session, item)
+        self.schedule_prepare(session)
+
+    async def rejoin(self, session):
+        """Join again with ``queue[0]`` after the call was lost (e.g. its voice worker died)."""
+        session.is_call_active = False
+        self._next_inputs.pop(session.chat_id, None)
+        if session.queue:
+            await self.start(session)
+
+    async def _play_next(self, session):
+        chat_id = session.chat_id
+        while session.queue:
+            item = session.queue[0]
+            try:
+                stream = self._take_prepared(chat_id, item)
+                if stream is None:
+                    stream_url = await self._stream_url_for(item, chat_id)
+                    if not stream_url:
+                        raise RuntimeError("no stream URL")
+                    stream = self.stream_factory(stream_url)
+                with stage("change_stream"):
+                    await self.call_py.change_stream(chat_id, stream)
+            except Exception as e:
+                # One bad entry (unavailable video, busy extractor, ...) must not stall the queue
+                logger.warning(f"⚠️ Skipping unplayable track in {chat_id}: {item['title']} ({e})")
+                session.queue.pop(0)
+                self.queue_store.pop(chat_id, 0)
+                continue
+            self._played(session, item)
+            return item
+        return None
+
+    async def advance(self, chat_id):
+        """Drop the finished track and start the next one. Returns the new item or None."""
+        session = self.sessions.peek(chat_id)
+        if session is None:
+            return None
+        started = time.monotonic()
+        async with session.lock:
+            if not session.is_call_active:
+                return None
+            if session.queue:
+                session.queue.pop(0)
+                self.queue_store.pop(chat_id, 0)
+            item = await self._play_next(session)
+            if item is None:
+                await self._leave(session)
+                return None
+        gap = time.monotonic() - started
+        self.gaps.append(gap)
+        STAGE_SECONDS.observe(gap, stage="track_transition")
+        if gap > self.gap_target:
+            logger.warning(f"⚠️ Track transition in {chat_id} took {gap * 1000:.0f} ms")
+        self.schedule_prepare(session)
+        return item
+
+    def _is_live(self, session):
+        """Still the chat's session and still in the call: a stop may have run while we waited for its lock."""
+        return self.sessions.peek(session.chat_id) is session and session.is_call_active
+
+    async def pause(self, chat_id):
+        session = self.sessions.peek(chat_id)
+        if not session or not session.is_call_active or session.paused:
+            return False
+        async with session.lock:
+            if not self._is_live(session) or session.paused:
+                return False
+            await self.call_py.pause_stream(chat_id)
+            session.paused = True
+            session.paused_at = time.monotonic()
+        return True
+
+    async def resume(self, chat_id):
+        session = self.sessions.peek(chat_id)
+        if not session or not session.is_call_active or not session.paused:
+            return False
+        async with session.lock:
+            if not self._is_live(session) or not session.paused:
+                return False
+            await self.call_py.resume_stream(chat_id)
+            session.paused = False
+            if session.paused_at is not None:
+                session.paused_total += time.monotonic() - session.paused_at
+                session.paused_at = None
+        return True
+
+    async def stop(self, chat_id):
+        session = self.sessions.peek(chat_id)
+        if session is None:
+            return False
+        async with session.lock:
+            session.queue.clear()
+            await self._leave(session)
+        return True
+
+    async def _leave(self, session):
+        chat_id = session.chat_id
+        if session.is_call_active:
+            try:
+                await self.call_py.leave_group_call(chat_id)
+            except Exception as e:
+                logger.warning(f"⚠️ Leave call failed in {chat_id}: {e}")
+        self.forget(chat_id)
+
+    def forget(self, chat_id):
+        """Drop all state for a chat whose call ended outside our control (kicked/closed)."""
+        session = self.sessions.drop(chat_id)
+        self.queue_store.clear(chat_id)
+        if session is not None:
+            session.is_call_active = False
+            session.current = None
+        self._next_inputs.pop(chat_id, None)
+        if self.relay:
+            self.relay.unsubscribe(chat_id)
+        if self.on_session_end:
+            self.on_session_end(chat_id)
+        preparing = self._preparing.pop(chat_id, None)
+        if preparing:
+            preparing.cancel()
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class PlaylistImport:
+    """Streams a Spotify collection into one chat's queue.
+
+    One task pages through ``pages`` (an async iterator of track lists) into
+    a bounded queue; ``workers`` tasks match each track with ``match`` and
+    hand the result to ``enqueue`` immediately, so playback starts with the
+    first match while the rest are still being resolved. Tracks are
+    enqueued in the order they resolve, not playlist order. Duplicates (by
+    Spotify ID, then by the matched item's ``id``) are skipped.
+    """
+
+    def __init__(self, pages, match, enqueue, workers=4, buffer=100,
+                 on_progress=None, progress_interval=3, seen_ids=()):
+        self.pages = pages
+        self.match = match
+        self.enqueue = enqueue
+        self.workers = workers
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self.total = 0
+        self.queued = 0
+        self.skipped = 0
+        self.duplicates = 0
+        self.error = None
+        self._pending = asyncio.Queue(maxsize=buffer)
+        self._spotify_ids = set()
+        self._item_ids = set(seen_ids)
+        self._last_progress = 0
+
+    async def _produce(self):
+        try:
+            async for page in self.pages:
+                for track in page:
+                    if track["id"] in self._spotify_ids:
+                        self.duplicates += 1
+                        continue
+                    self._spotify_ids.add(track["id"])
+                    self.total += 1
+                    await self._pending.put(track)
+        except Exception as e:
+            # Keep what was fetched so far; the workers drain it
+            logger.error(f"❌ Playlist Fetch Error: {e}")
+            self.error = e
+        finally:
+            for _ in range(self.workers):
+                await self._pending.put(_DONE)
+
+    async def _work(self):
+        while True:
+            track = await self._pending.get()
+            if track is _DONE:
+                return
+            try:
+                item = await self.match(track)
+            except Exception as e:
+                logger.warning(f"⚠️ Playlist track match failed: {e}")
+                item = None
+            if item is None:
+                self.skipped += 1
+            elif item["id"] in self._item_ids:
+                self.duplicates += 1
+            else:
+                self._item_ids.add(item["id"])
+                try:
+                    await self.enqueue(item)
+                    self.queued += 1
+                except Exception as e:
+                    # e.g. joining the call failed on the first track; the next one tries again
+                    logger.warning(f"⚠️ Playlist track enqueue failed: {e}")
+                    self._item_ids.discard(item["id"])
+                    self.skipped += 1
+            await self._report(finished=False)
+
+    async def _report(self, finished):
+        if not self.on_progress:
+            return
+        now = time.monotonic()
+        if not finished and now - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = now
+        try:
+            await self.on_progress(self, finished)
+        except Exception as e:
+            logger.warning(f"⚠️ Playlist progress update failed: {e}")
+
+    async def run(self):
+        producer = asyncio.ensure_future(self._produce())
+        workers = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+        try:
+            await asyncio.gather(producer, *workers)
+        finally:
+            for task in (producer, *workers):
+                task.cancel()
+        await self._report(finished=True)
+        return self
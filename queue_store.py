@@ -0,0 +1,165 @@
+import asyncio
+import json
+import logging
+import os
+
+import aiofiles
+
+from metrics import stage
+
+logger = logging.getLogger(__name__)
+
+
+class QueueStore:
+    """Journaled persistence for the per-chat queues.
+
+    Every queue change is one JSON line appended to ``journal_path``; lines
+    are batched by a background writer, so an enqueue costs O(1) I/O no
+    matter how many chats exist. ``compact`` writes an atomic snapshot
+    (tmp file + fsync + rename) tagged with the last sequence number it
+    contains and then truncates the journal. Recovery replays the journal
+    records newer than the snapshot, which also makes a crash between the
+    rename and the truncate harmless.
+    """
+
+    def __init__(self, snapshot_path="queue.json", journal_path="queue.journal", compact_every=2000):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.compact_every = compact_every
+        self.seq = 0
+        self._buffer = []
+        self._wakeup = asyncio.Event()
+        self._file_lock = asyncio.Lock()
+        self._since_compact = 0
+        self._writer = None
+
+    # ✅ Recovery
+    async def load(self):
+        queue = {}
+        snapshot_seq = 0
+        try:
+            async with aiofiles.open(self.snapshot_path, "r") as f:
+                data = await f.read()
+            snapshot = json.loads(data) if data else {}
+            if "seq" in snapshot and "queue" in snapshot:
+                snapshot_seq, snapshot = snapshot["seq"], snapshot["queue"]
+            # Older files are a bare {chat_id: [items]} dict
+            queue = {int(k): v for k, v in snapshot.items()}
+        except (FileNotFoundError, json.JSONDecodeError, ValueError, AttributeError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.error(f"❌ Queue snapshot unreadable, starting from journal: {e}")
+
+        self.seq = snapshot_seq
+        replayed = 0
+        try:
+            async with aiofiles.open(self.journal_path, "r") as f:
+                async for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # torn write at the tail of the journal
+                    if record["seq"] <= snapshot_seq:
+                        continue
+                    self._apply(queue, record)
+                    self.seq = record["seq"]
+                    replayed += 1
+        except FileNotFoundError:
+            pass
+        self._since_compact = replayed
+        logger.info(f"✅ Queue restored: {len(queue)} chats, {replayed} journal records replayed")
+        return queue
+
+    @staticmethod
+    def _apply(queue, record):
+        chat_id = record["chat"]
+        op = record["op"]
+        if op == "push":
+            queue.setdefault(chat_id, []).append(record["item"])
+        elif op == "pop":
+            items = queue.get(chat_id)
+            if items and len(items) > record.get("index", 0):
+                items.pop(record.get("index", 0))
+            if not items:
+                queue.pop(chat_id, None)
+        elif op == "clear":
+            queue.pop(chat_id, None)
+
+    # ✅ Journal
+    def record(self, op, chat_id, **fields):
+        """Journal a change that was just made to the in-memory queue.
+
+        Synchronous on purpose: it must run in the same loop step as the
+        mutation so sequence numbers and the snapshot stay consistent.
+        """
+        self.seq += 1
+        self._buffer.append((self.seq, json.dumps(dict(fields, seq=self.seq, op=op, chat=chat_id))))
+        self._since_compact += 1
+        self._wakeup.set()
+
+    @property
+    def buffered(self):
+        return len(self._buffer)
+
+    def push(self, chat_id, item):
+        self.record("push", chat_id, item=item)
+
+    def pop(self, chat_id, index=0):
+        self.record("pop", chat_id, index=index)
+
+    def clear(self, chat_id):
+        self.record("clear", chat_id)
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        async with self._file_lock:
+            lines, self._buffer = self._buffer, []
+            with stage("queue_journal_write"):
+                async with aiofiles.open(self.journal_path, "a") as f:
+                    await f.write("".join(f"{line}\n" for _, line in lines))
+
+    async def _run_writer(self, queue_getter):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                if self._since_compact >= self.compact_every:
+                    await self.compact(queue_getter())
+            except Exception as e:
+                logger.error(f"❌ Queue Journal Error: {e}")
+
+    def start(self, queue_getter):
+        if self._writer is None:
+            self._writer = asyncio.ensure_future(self._run_writer(queue_getter))
+
+    # ✅ Snapshots
+    def _write_snapshot(self, data):
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    async def compact(self, queue):
+        async with self._file_lock:
+            # Capture queue and seq under the lock, in one loop step: a flush that
+            # ran while we waited has already put newer records in the journal
+            seq = self.seq
+            data = json.dumps({"seq": seq, "queue": queue})
+            self._since_compact = 0
+            with stage("queue_compact"):
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, self._write_snapshot, data)
+                # Everything already in the journal file has seq <= snapshot seq
+                async with aiofiles.open(self.journal_path, "w") as f:
+                    await f.truncate(0)
+            self._buffer = [(s, line) for s, line in self._buffer if s > seq]
+
+    async def close(self, queue):
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
+        await self.flush()
+        await self.compact(queue)
@@ -0,0 +1,342 @@
+import asyncio
+import errno
+import itertools
+import logging
+import os
+import struct
+import time
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 48000
+CHANNELS = 2
+FRAME_BYTES = SAMPLE_RATE * CHANNELS * 2 // 50  # 20 ms of s16le PCM
+RELAY_PREFIX = "relay:"
+
+# Streaming WAV header with "unknown" sizes, so the per-call ffmpeg reads the
+# PCM as-is instead of decoding anything
+WAV_HEADER = (
+    b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVEfmt "
+    + struct.pack("<IHHIIHH", 16, 1, CHANNELS, SAMPLE_RATE, SAMPLE_RATE * CHANNELS * 2, CHANNELS * 2, 16)
+    + b"data" + struct.pack("<I", 0xFFFFFFFF)
+)
+
+
+class RelayUnavailable(Exception):
+    """The shared decoder could not be started; play the source directly instead."""
+
+
+def relay_source(url):
+    """Queue item source for a stream that should be decoded once and shared."""
+    return f"{RELAY_PREFIX}{url}"
+
+
+def is_relay_source(source):
+    return source.startswith(RELAY_PREFIX)
+
+
+class FrameRing:
+    """Fixed-size ring of PCM frames written by one decoder and read by many subscribers.
+
+    Frames are addressed by a growing sequence number; a reader that falls
+    more than ``capacity`` frames behind has lost them and skips ahead.
+    """
+
+    def __init__(self, capacity=250, frame_size=FRAME_BYTES):
+        self.capacity = capacity
+        self.frame_size = frame_size
+        self.head = 0  # sequence number of the next frame to be written
+        self.closed = False
+        self._buffer = bytearray(capacity * frame_size)
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def write(self, frame):
+        start = (self.head % self.capacity) * self.frame_size
+        self._buffer[start:start + self.frame_size] = frame
+        self.head += 1
+        self._notify()
+
+    def close(self):
+        self.closed = True
+        self._notify()
+
+    def oldest(self):
+        return max(0, self.head - self.capacity)
+
+    def read(self, seq, end):
+        """Frames ``seq``..``end - 1`` as one bytes object; ``seq`` must not be older than ``oldest()``."""
+        chunks = []
+        while seq < end:
+            index = seq % self.capacity
+            run = min(end - seq, self.capacity - index)
+            start = index * self.frame_size
+            chunks.append(self._buffer[start:start + run * self.frame_size])
+            seq += run
+        return b"".join(chunks)
+
+    async def wait(self, seq):
+        while seq >= self.head and not self.closed:
+            await self._changed.wait()
+
+
+class StreamRelay:
+    """One upstream connection and one ffmpeg decode feeding a FrameRing.
+
+    Live sources are restarted with exponential backoff when ffmpeg exits;
+    after ``max_failures`` quick failures in a row, or if ffmpeg cannot be
+    spawned at all, the relay gives up and marks itself unhealthy. The ring
+    is closed whenever the decode loop ends, so no subscriber waits forever.
+    """
+
+    def __init__(self, url, ring_frames, ffmpeg="ffmpeg", live=True, max_failures=5):
+        self.url = url
+        self.ring = FrameRing(ring_frames)
+        self.ffmpeg = ffmpeg
+        self.live = live
+        self.max_failures = max_failures
+        self.subscribers = {}  # chat_id -> feed task
+        self.healthy = True
+        self.restarts = 0
+        self._task = None
+        self._started = asyncio.get_running_loop().create_future()
+        self._idle_timer = None
+
+    def _command(self):
+        command = [self.ffmpeg, "-nostdin", "-loglevel", "error", "-re"]
+        if self.url.startswith(("http://", "https://")):
+            command += ["-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "5"]
+        return command + ["-i", self.url, "-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", str(CHANNELS), "pipe:1"]
+
+    async def start(self):
+        """Start the decoder if needed; raises ``RelayUnavailable`` if ffmpeg could not be spawned."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+        await asyncio.shield(self._started)
+
+    async def _run(self):
+        failures = 0
+        try:
+            while True:
+                started = time.monotonic()
+                process = await asyncio.create_subprocess_exec(
+                    *self._command(), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+                )
+                if not self._started.done():
+                    self._started.set_result(None)
+                try:
+                    while True:
+                        self.ring.write(await process.stdout.readexactly(FRAME_BYTES))
+                except asyncio.IncompleteReadError:
+                    pass
+                finally:
+                    if process.returncode is None:
+                        process.kill()
+                    await process.wait()
+                if not self.live or not self.subscribers:
+                    break
+                # A long run resets the count; repeated quick exits mean the upstream is down
+                failures = 0 if time.monotonic() - started > 30 else failures + 1
+                if failures > self.max_failures:
+                    logger.error(f"❌ Relay giving up on {self.url} after {failures} failures")
+                    self.healthy = False
+                    break
+                self.restarts += 1
+                delay = min(30, 2 ** failures)
+                logger.warning(f"⚠️ Relay upstream {self.url} ended, reconnecting in {delay}s")
+                await asyncio.sleep(delay)
+        except Exception as e:
+            # e.g. ffmpeg missing or out of file descriptors
+            logger.error(f"❌ Relay for {self.url} failed: {e}")
+            self.healthy = False
+        finally:
+            if not self._started.done():
+                self._started.set_exception(RelayUnavailable(f"decoder for {self.url} did not start"))
+            self.ring.close()
+
+    async def stop(self):
+        if self._idle_timer:
+            self._idle_timer.cancel()
+        for task in self.subscribers.values():
+            task.cancel()
+        self.subscribers.clear()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self.ring.close()
+
+
+class RelayHub:
+    """Shares one decode per source across every call playing it.
+
+    ``subscribe`` hands each chat its own FIFO carrying the shared PCM as a
+    streaming WAV, which PyTgCalls plays like any other input. A subscriber
+    that cannot keep up has frames dropped instead of slowing the others
+    down, and a source with no subscribers is kept for ``idle_grace``
+    seconds so a quick rejoin does not reconnect upstream.
+    """
+
+    def __init__(self, directory="relay", ring_seconds=5, idle_grace=30, ffmpeg="ffmpeg",
+                 open_timeout=15, max_lag_frames=100, probe_timeout=10):
+        self.directory = directory
+        self.ring_frames = ring_seconds * 50
+        self.idle_grace = idle_grace
+        self.ffmpeg = ffmpeg
+        self.open_timeout = open_timeout
+        self.max_lag_bytes = max_lag_frames * FRAME_BYTES
+        self.probe_timeout = aiohttp.ClientTimeout(total=probe_timeout)
+        self.relays = {}         # url -> StreamRelay
+        self._subscriptions = {}  # chat_id -> url
+        self.health = {}         # url -> (ok, checked_at)
+        self._session = None
+        self._fifo_ids = itertools.count()
+        os.makedirs(directory, exist_ok=True)
+
+    def remove_stale_fifos(self):
+        """Delete FIFOs left by a previous run; call once at startup, before any subscription."""
+        for name in os.listdir(self.directory):
+            if name.endswith(".wav"):
+                os.remove(os.path.join(self.directory, name))
+
+    # ✅ Subscriptions
+    async def subscribe(self, url, chat_id, live=True):
+        """Attach ``chat_id`` to the shared decode of ``url``; returns the FIFO path to play."""
+        self.unsubscribe(chat_id)
+        relay = self.relays.get(url)
+        if relay is None or relay.ring.closed:
+            relay = self.relays[url] = StreamRelay(url, self.ring_frames, self.ffmpeg, live)
+        if relay._idle_timer:
+            relay._idle_timer.cancel()
+            relay._idle_timer = None
+        try:
+            await relay.start()
+        except RelayUnavailable:
+            if self.relays.get(url) is relay:
+                del self.relays[url]
+            self.health[url] = (False, time.time())
+            raise
+        # A fresh name per subscription: the previous feed may still be cleaning up its FIFO
+        path = os.path.join(self.directory, f"{chat_id}-{next(self._fifo_ids)}.wav")
+        os.mkfifo(path)
+        relay.subscribers[chat_id] = asyncio.ensure_future(self._feed(relay, chat_id, path))
+        self._subscriptions[chat_id] = url
+        return path
+
+    def unsubscribe(self, chat_id):
+        url = self._subscriptions.pop(chat_id, None)
+        relay = self.relays.get(url)
+        if relay is None:
+            return
+        task = relay.subscribers.pop(chat_id, None)
+        if task:
+            task.cancel()
+        self._schedule_idle(relay)
+
+    def _schedule_idle(self, relay):
+        if not relay.subscribers and relay._idle_timer is None:
+            relay._idle_timer = asyncio.get_running_loop().call_later(
+                self.idle_grace, lambda: asyncio.ensure_future(self._drop_idle(relay.url))
+            )
+
+    async def _drop_idle(self, url):
+        relay = self.relays.get(url)
+        if relay and not relay.subscribers:
+            del self.relays[url]
+            relay._idle_timer = None
+            await relay.stop()
+
+    async def _open_fifo(self, path):
+        # O_NONBLOCK open fails with ENXIO until the call's ffmpeg opens the read end
+        deadline = time.monotonic() + self.open_timeout
+        while True:
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+                break
+            except OSError as e:
+                if e.errno != errno.ENXIO or time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.05)
+        transport, _ = await asyncio.get_running_loop().connect_write_pipe(
+            asyncio.Protocol, os.fdopen(fd, "wb", buffering=0)
+        )
+        return transport
+
+    async def _feed(self, relay, chat_id, path):
+        transport = None
+        try:
+            transport = await self._open_fifo(path)
+            transport.write(WAV_HEADER)
+            ring = relay.ring
+            seq = ring.head
+            while True:
+                await ring.wait(seq)
+                if seq >= ring.head:
+                    break  # source closed
+                if seq < ring.oldest() or transport.get_write_buffer_size() > self.max_lag_bytes:
+                    seq = ring.head  # too far behind: drop to live
+                    continue
+                end = ring.head
+                transport.write(ring.read(seq, end))
+                seq = end
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(f"⚠️ Relay feed for {chat_id} stopped: {e}")
+        finally:
+            # Closing the FIFO ends the call's stream, which fires on_stream_end
+            if transport is not None:
+                transport.close()
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            if relay.subscribers.get(chat_id) is asyncio.current_task():
+                del relay.subscribers[chat_id]
+                self._subscriptions.pop(chat_id, None)
+                self._schedule_idle(relay)
+
+    # ✅ Health
+    async def probe(self, url):
+        """True if the station answers and starts sending audio within the timeout."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=self.probe_timeout)
+        try:
+            async with self._session.get(url) as resp:
+                ok = resp.status == 200 and bool(await resp.content.read(4096))
+        except Exception as e:
+            logger.info(f"Station probe failed for {url}: {e}")
+            ok = False
+        self.health[url] = (ok, time.time())
+        return ok
+
+    async def run_health_checks(self, urls, interval=300):
+        """Probe every URL from ``urls()`` (in parallel) every ``interval`` seconds."""
+        while True:
+            await asyncio.gather(*(self.probe(url) for url in urls()))
+            await asyncio.sleep(interval)
+
+    def is_healthy(self, url):
+        relay = self.relays.get(url)
+        if relay is not None and not relay.healthy:
+            return False
+        return self.health.get(url, (True, 0))[0]
+
+    def snapshot(self):
+        return {
+            "sources": len(self.relays),
+            "subscribers": sum(len(relay.subscribers) for relay in self.relays.values()),
+            "restarts": sum(relay.restarts for relay in self.relays.values()),
+        }
+
+    async def close(self):
+        for relay in list(self.relays.values()):
+            await relay.stop()
+        self.relays.clear()
+        self._subscriptions.clear()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
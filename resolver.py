@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import re
+import time
+from urllib.parse import urlparse, parse_qs
+
+from cache import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+_YOUTUBE_URL = re.compile(
+    r"(?:https?://)?(?:www\.|m\.|music\.)?(?:youtu\.be/|youtube\.com/(?:watch\?(?:\S*&)?v=|shorts/|embed/))([\w-]{11})"
+)
+
+
+def youtube_source(video_id):
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def youtube_link(video_id):
+    return f"https://youtu.be/{video_id}"
+
+
+def parse_youtube_id(text):
+    """Video ID from a youtube.com / youtu.be link in ``text``, or None."""
+    match = _YOUTUBE_URL.search(text)
+    return match.group(1) if match else None
+
+
+def make_queue_item(source, title, video_id, duration=0):
+    """Queue entries hold stable identifiers only; playable URLs are resolved lazily."""
+    return {"source": source, "title": title, "id": video_id, "duration": duration}
+
+
+def upgrade_queue_item(item):
+    """Convert a legacy ``(video_url, title, video_id)`` entry from an old queue.json."""
+    if isinstance(item, dict):
+        return item
+    video_url, title, video_id = item
+    source = video_url if video_id == "video" else youtube_source(video_id)
+    return make_queue_item(source, title, video_id)
+
+
+def stream_expiry(url, default_ttl):
+    """googlevideo URLs carry their expiry as an ``expire=<unix time>`` parameter."""
+    try:
+        return float(parse_qs(urlparse(url).query)["expire"][0])
+    except (KeyError, IndexError, ValueError):
+        return time.time() + default_ttl
+
+
+class StreamResolver:
+    """Maps stable sources to playable stream URLs and tracks when they expire.
+
+    A URL is considered stale ``safety_margin`` seconds before its expiry so a
+    track never starts on a link that dies mid-song. ``prefetch`` resolves
+    upcoming queue entries in the background.
+    """
+
+    def __init__(self, extractor, safety_margin=600, default_ttl=4 * 60 * 60, max_entries=4096):
+        self.extractor = extractor
+        self.safety_margin = safety_margin
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._urls = {}  # source -> (stream_url, expires_at)
+        self._lookups = SingleFlight(negative_ttl=15)
+        self._prefetching = set()
+
+    def fresh_url(self, source):
+        entry = self._urls.get(source)
+        if entry and entry[1] - self.safety_margin > time.time():
+            return entry[0]
+        return None
+
+    def prime(self, source, stream_url):
+        """Remember a URL we already have (e.g. from a search result) if still fresh."""
+        if not stream_url:
+            return
+        expires_at = stream_expiry(stream_url, self.default_ttl)
+        if expires_at - self.safety_margin > time.time():
+            self._store(source, stream_url, expires_at)
+
+    def _store(self, source, stream_url, expires_at):
+        if len(self._urls) >= self.max_entries:
+            now = time.time()
+            self._urls = {s: e for s, e in self._urls.items() if e[1] - self.safety_margin > now}
+        self._urls[source] = (stream_url, expires_at)
+
+    async def resolve(self, source):
+        stream_url = self.fresh_url(source)
+        if stream_url:
+            return stream_url
+        return await self._lookups.run(source, lambda: self._extract(source))
+
+    async def _extract(self, source):
+        info = await self.extractor.extract(source)
+        if not info or not info.get("url"):
+            return None
+        self._store(source, info["url"], stream_expiry(info["url"], self.default_ttl))
+        return info["url"]
+
+    def prefetch(self, items):
+        for item in items:
+            source = item["source"]
+            if source in self._prefetching or self.fresh_url(source):
+                continue
+            self._prefetching.add(source)
+            asyncio.ensure_future(self._prefetch_one(source))
+
+    async def _prefetch_one(self, source):
+        try:
+            await self.resolve(source)
+        except Exception as e:
+            logger.warning(f"⚠️ Prefetch failed for {source}: {e}")
+        finally:
+            self._prefetching.discard(source)
@@ -0,0 +1,99 @@
+"""Voice-call worker process for ``ShardedCalls`` (started by the bot, not by hand).
+
+Runs one assistant client and one PyTgCalls instance, executes the
+join/change/pause/resume/leave requests it receives over the coordinator's
+Unix socket, and reports stream-end/kicked/closed events back.
+"""
+import argparse
+import asyncio
+import logging
+import os
+
+from pyrogram import Client
+from pytgcalls import PyTgCalls
+
+from config import API_ID, API_HASH
+from logging_setup import setup_logging, stop_logging
+from playback import build_stream
+from sharding import read_message, write_message
+
+logger = logging.getLogger("shard_worker")
+
+HEARTBEAT_INTERVAL = 5
+
+
+async def serve(index, socket_path):
+    # ROLA_ASSISTANT_SESSION_<n> holds the session string of worker n's assistant account
+    assistant = Client(
+        os.environ.get(f"ROLA_ASSISTANT_SESSION_{index}") or f"RolaVibeAssistant{index}",
+        api_id=API_ID,
+        api_hash=API_HASH
+    )
+    calls = PyTgCalls(assistant)
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+
+    def emit(event, chat_id):
+        write_message(writer, {"event": event, "chat_id": chat_id})
+
+    @calls.on_stream_end()
+    async def stream_end_handler(client, update):
+        emit("stream_end", update.chat_id)
+
+    @calls.on_kicked()
+    async def kicked_handler(client, chat_id):
+        emit("kicked", chat_id)
+
+    @calls.on_closed_voice_chat()
+    async def closed_handler(client, chat_id):
+        emit("closed_voice_chat", chat_id)
+
+    operations = {
+        "join": lambda chat_id, request: calls.join_group_call(chat_id, build_stream(request["stream"])),
+        "change": lambda chat_id, request: calls.change_stream(chat_id, build_stream(request["stream"])),
+        "pause": lambda chat_id, request: calls.pause_stream(chat_id),
+        "resume": lambda chat_id, request: calls.resume_stream(chat_id),
+        "leave": lambda chat_id, request: calls.leave_group_call(chat_id),
+    }
+
+    async def handle(request):
+        try:
+            await operations[request["op"]](request["chat_id"], request)
+            write_message(writer, {"id": request["id"], "ok": True})
+        except Exception as e:
+            logger.error(f"❌ Shard {index} {request.get('op')} failed in {request.get('chat_id')}: {e}")
+            write_message(writer, {"id": request["id"], "ok": False, "error": str(e)})
+
+    async def heartbeat():
+        while True:
+            write_message(writer, {"event": "ping", "chat_id": None})
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    await assistant.start()
+    await calls.start()
+    write_message(writer, {"worker": index})
+    beats = asyncio.create_task(heartbeat())
+    logger.info(f"✅ Shard worker {index} ready")
+    try:
+        while True:
+            asyncio.create_task(handle(await read_message(reader)))
+    except ConnectionError:
+        logger.warning(f"⚠️ Shard worker {index} lost the coordinator, exiting")
+    finally:
+        beats.cancel()
+        await assistant.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--index", type=int, required=True)
+    parser.add_argument("--socket", required=True)
+    args = parser.parse_args()
+    setup_logging(f"rolavibe-shard{args.index}.log")
+    try:
+        asyncio.run(serve(args.index, args.socket))
+    finally:
+        stop_logging()
+
+
+if __name__ == "__main__":
+    main()
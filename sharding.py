@@ -0,0 +1,293 @@
+import asyncio
+import bisect
+import hashlib
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+import types
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "shard_worker.py")
+
+
+# ✅ IPC: one JSON object per line over a Unix socket
+async def read_message(reader):
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("peer closed the connection")
+    return json.loads(line)
+
+
+def write_message(writer, message):
+    writer.write(json.dumps(message, ensure_ascii=False).encode() + b"\n")
+
+
+def _point(key):
+    return int.from_bytes(hashlib.blake2b(str(key).encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hashing of chat IDs onto workers, ``vnodes`` points per worker.
+
+    Removing a worker only moves the chats it owned; everyone else keeps
+    their worker.
+    """
+
+    def __init__(self, vnodes=64):
+        self.vnodes = vnodes
+        self._points = []
+        self._owners = []
+
+    def add(self, node):
+        for i in range(self.vnodes):
+            point = _point(f"{node}#{i}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node):
+        keep = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+        self._points = [p for p, _ in keep]
+        self._owners = [o for _, o in keep]
+
+    def node_for(self, key):
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _point(key)) % len(self._points)
+        return self._owners[index]
+
+
+class _Worker:
+    __slots__ = ("index", "process", "reader", "writer", "pending", "last_seen", "chats")
+
+    def __init__(self, index):
+        self.index = index
+        self.process = None
+        self.reader = None
+        self.writer = None
+        self.pending = {}  # request id -> future
+        self.last_seen = 0
+        self.chats = set()
+
+    @property
+    def alive(self):
+        return self.writer is not None
+
+
+class ShardedCalls:
+    """Stands in for PyTgCalls: voice calls run in ``workers`` child processes.
+
+    Each worker owns its own assistant client and PyTgCalls instance, and
+    gets the chats that the consistent-hash ring assigns to it. A chat stays
+    on the worker that joined its call. The worker's events
+    (stream end, kicked, closed) are dispatched to handlers registered with
+    the usual ``on_*`` decorators. A worker that exits or stops
+    sending heartbeats is taken off the ring and respawned, and the chats
+    it was serving are handed to ``on_worker_lost`` to be re-joined elsewhere.
+    Streams are passed as plain paths/URLs; the worker builds the input.
+    """
+
+    def __init__(self, socket_path, workers, on_worker_lost=None, vnodes=64,
+                 request_timeout=20, heartbeat_timeout=15, respawn_delay=5):
+        self.socket_path = socket_path
+        self.workers = {i: _Worker(i) for i in range(workers)}
+        self.on_worker_lost = on_worker_lost
+        self.ring = HashRing(vnodes)
+        self.request_timeout = request_timeout
+        self.heartbeat_timeout = heartbeat_timeout
+        self.respawn_delay = respawn_delay
+        self.owners = {}  # chat_id -> worker index of the joined call
+        self.handlers = {"stream_end": [], "kicked": [], "closed_voice_chat": []}
+        self._ids = itertools.count(1)
+        self._server = None
+        self._tasks = []
+        self._registered = asyncio.Event()
+        self._closing = False
+
+    # ✅ PyTgCalls-style handler registration
+    def _register(self, event):
+        def decorator(func):
+            self.handlers[event].append(func)
+            return func
+        return decorator
+
+    def on_stream_end(self):
+        return self._register("stream_end")
+
+    def on_kicked(self):
+        return self._register("kicked")
+
+    def on_closed_voice_chat(self):
+        return self._register("closed_voice_chat")
+
+    # ✅ Lifecycle
+    async def start(self, ready_timeout=60):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._accept, path=self.socket_path)
+        for worker in self.workers.values():
+            self._tasks.append(asyncio.create_task(self._supervise(worker)))
+        self._tasks.append(asyncio.create_task(self._watch_heartbeats()))
+        # One live worker is enough to serve; the rest join the ring as they come up
+        await asyncio.wait_for(self._registered.wait(), ready_timeout)
+
+    async def stop(self):
+        self._closing = True
+        for task in self._tasks:
+            task.cancel()
+        for worker in self.workers.values():
+            if worker.process and worker.process.returncode is None:
+                worker.process.terminate()
+                try:
+                    await asyncio.wait_for(worker.process.wait(), 10)
+                except asyncio.TimeoutError:
+                    worker.process.kill()
+        if self._server:
+            self._server.close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    async def _supervise(self, worker):
+        while not self._closing:
+            worker.process = await asyncio.create_subprocess_exec(
+                sys.executable, WORKER_SCRIPT, "--index", str(worker.index), "--socket", self.socket_path
+            )
+            code = await worker.process.wait()
+            if self._closing:
+                return
+            logger.error(f"❌ Shard worker {worker.index} exited with {code}, respawning in {self.respawn_delay}s")
+            await self._lost(worker)
+            await asyncio.sleep(self.respawn_delay)
+
+    async def _accept(self, reader, writer):
+        try:
+            hello = await read_message(reader)
+            worker = self.workers[hello["worker"]]
+        except Exception as e:
+            logger.warning(f"⚠️ Rejected shard connection: {e}")
+            writer.close()
+            return
+        worker.reader, worker.writer = reader, writer
+        worker.last_seen = time.monotonic()
+        self.ring.add(worker.index)
+        self._registered.set()
+        logger.info(f"✅ Shard worker {worker.index} registered")
+        try:
+            while True:
+                message = await read_message(reader)
+                worker.last_seen = time.monotonic()
+                if message.get("event") == "ping":
+                    continue
+                if "event" in message:
+                    asyncio.ensure_future(self._dispatch(worker, message))
+                elif "id" in message:
+                    future = worker.pending.pop(message["id"], None)
+                    if future and not future.done():
+                        if message.get("ok"):
+                            future.set_result(message.get("result"))
+                        else:
+                            future.set_exception(RuntimeError(message.get("error", "worker error")))
+        except (ConnectionError, json.JSONDecodeError, asyncio.IncompleteReadError):
+            pass
+        if worker.writer is writer:
+            await self._lost(worker)
+
+    async def _watch_heartbeats(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_timeout / 3)
+            now = time.monotonic()
+            for worker in self.workers.values():
+                if worker.alive and now - worker.last_seen > self.heartbeat_timeout:
+                    logger.error(f"❌ Shard worker {worker.index} stopped responding")
+                    if worker.process and worker.process.returncode is None:
+                        worker.process.kill()  # the supervisor respawns it
+                    await self._lost(worker)
+
+    async def _lost(self, worker):
+        if not worker.alive:
+            return
+        worker.writer.close()
+        worker.reader = worker.writer = None
+        self.ring.remove(worker.index)
+        for future in worker.pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError(f"shard worker {worker.index} is gone"))
+        worker.pending.clear()
+        chats = sorted(worker.chats)
+        worker.chats.clear()
+        for chat_id in chats:
+            self.owners.pop(chat_id, None)
+        if chats and self.on_worker_lost and not self._closing:
+            logger.warning(f"⚠️ Rebalancing {len(chats)} chats from shard worker {worker.index}")
+            asyncio.ensure_future(self.on_worker_lost(chats))
+
+    async def _dispatch(self, worker, message):
+        event, chat_id = message["event"], message["chat_id"]
+        if event in ("kicked", "closed_voice_chat"):
+            if self.owners.get(chat_id) == worker.index:
+                del self.owners[chat_id]
+                worker.chats.discard(chat_id)
+            args = (self, chat_id)
+        else:
+            args = (self, types.SimpleNamespace(chat_id=chat_id))
+        for handler in self.handlers.get(event, []):
+            try:
+                await handler(*args)
+            except Exception as e:
+                logger.error(f"❌ Shard event handler error ({event} in {chat_id}): {e}")
+
+    # ✅ Requests
+    async def _request(self, worker, op, chat_id, **args):
+        if not worker.alive:
+            raise ConnectionError(f"shard worker {worker.index} is not connected")
+        request_id = next(self._ids)
+        future = worker.pending[request_id] = asyncio.get_running_loop().create_future()
+        write_message(worker.writer, {"id": request_id, "op": op, "chat_id": chat_id, **args})
+        try:
+            return await asyncio.wait_for(future, self.request_timeout)
+        finally:
+            worker.pending.pop(request_id, None)
+
+    def _owner(self, chat_id):
+        index = self.owners.get(chat_id)
+        if index is None:
+            raise RuntimeError(f"No voice call for {chat_id}")
+        return self.workers[index]
+
+    async def join_group_call(self, chat_id, stream, **kwargs):
+        index = self.owners.get(chat_id)
+        if index is None:
+            index = self.ring.node_for(chat_id)
+        if index is None:
+            raise RuntimeError("No shard worker is available")
+        worker = self.workers[index]
+        await self._request(worker, "join", chat_id, stream=stream)
+        self.owners[chat_id] = index
+        worker.chats.add(chat_id)
+
+    async def change_stream(self, chat_id, stream):
+        await self._request(self._owner(chat_id), "change", chat_id, stream=stream)
+
+    async def pause_stream(self, chat_id):
+        await self._request(self._owner(chat_id), "pause", chat_id)
+
+    async def resume_stream(self, chat_id):
+        await self._request(self._owner(chat_id), "resume", chat_id)
+
+    async def leave_group_call(self, chat_id):
+        worker = self._owner(chat_id)
+        try:
+            await self._request(worker, "leave", chat_id)
+        finally:
+            self.owners.pop(chat_id, None)
+            worker.chats.discard(chat_id)
+
+    def snapshot(self):
+        return {
+            index: {"alive": worker.alive, "calls": len(worker.chats)}
+            for index, worker in self.workers.items()
+        }
@@ -0,0 +1,149 @@
+import asyncio
+import base64
+import logging
+import re
+import time
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+SPOTIFY_API_BASE = "https://api.spotify.com/v1"
+SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
+TRACKS_BATCH_SIZE = 50  # Spotify's limit for GET /tracks?ids=
+PAGE_SIZES = {"playlist": 100, "album": 50}  # max ``limit`` per page
+
+_SPOTIFY_REF = re.compile(
+    r"(?:https?://open\.spotify\.com/(?:intl-[\w-]+/)?|spotify:)(track|album|playlist)[/:]([A-Za-z0-9]+)"
+)
+
+
+def parse_spotify_url(text):
+    """``(kind, id)`` for a Spotify track/album/playlist URL or URI, else ``None``."""
+    match = _SPOTIFY_REF.search(text or "")
+    return (match.group(1), match.group(2)) if match else None
+
+
+class SpotifyAPIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"Spotify API {status}: {message}")
+        self.status = status
+
+
+class AsyncSpotify:
+    """Minimal non-blocking Spotify Web API client (client-credentials flow).
+
+    One pooled ``aiohttp`` session is shared by every request, the access
+    token is reused until ``refresh_margin`` seconds before it expires, and
+    429 responses are retried after the server's ``Retry-After``. The base
+    URLs can be pointed at a local stand-in server for testing.
+    """
+
+    def __init__(self, client_id, client_secret, api_base=SPOTIFY_API_BASE,
+                 token_url=SPOTIFY_TOKEN_URL, max_connections=20, max_retries=3,
+                 refresh_margin=60, timeout=10):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.api_base = api_base.rstrip("/")
+        self.token_url = token_url
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.refresh_margin = refresh_margin
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session = None
+        self._token = None
+        self._token_expires_at = 0
+        self._token_lock = asyncio.Lock()
+
+    # ✅ Session & Token
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def _get_token(self):
+        if self._token and time.monotonic() < self._token_expires_at - self.refresh_margin:
+            return self._token
+        async with self._token_lock:
+            # Another request may have refreshed it while we waited for the lock
+            if self._token and time.monotonic() < self._token_expires_at - self.refresh_margin:
+                return self._token
+            credentials = base64.b64encode(f"{self.client_id}:{self.client_secret}".encode()).decode()
+            async with self._get_session().post(
+                self.token_url,
+                data={"grant_type": "client_credentials"},
+                headers={"Authorization": f"Basic {credentials}"}
+            ) as resp:
+                payload = await resp.json(content_type=None)
+                if resp.status != 200:
+                    raise SpotifyAPIError(resp.status, payload.get("error_description", payload))
+            self._token = payload["access_token"]
+            self._token_expires_at = time.monotonic() + int(payload.get("expires_in", 3600))
+            return self._token
+
+    # ✅ Requests
+    async def _get(self, path, params=None):
+        for attempt in range(self.max_retries + 1):
+            token = await self._get_token()
+            async with self._get_session().get(
+                f"{self.api_base}{path}",
+                params=params,
+                headers={"Authorization": f"Bearer {token}"}
+            ) as resp:
+                if resp.status == 429 and attempt < self.max_retries:
+                    retry_after = float(resp.headers.get("Retry-After", 2 ** attempt))
+                    logger.warning(f"⚠️ Spotify rate limited, retrying in {retry_after}s")
+                    await asyncio.sleep(retry_after)
+                    continue
+                if resp.status == 401 and attempt < self.max_retries:
+                    self._token = None  # revoked/expired early: fetch a new one
+                    continue
+                payload = await resp.json(content_type=None)
+                if resp.status != 200:
+                    message = payload.get("error", {}).get("message", payload) if isinstance(payload, dict) else payload
+                    raise SpotifyAPIError(resp.status, message)
+                return payload
+        raise SpotifyAPIError(429, "retries exhausted")
+
+    async def search_tracks(self, query, limit=1):
+        payload = await self._get("/search", {"q": query, "type": "track", "limit": limit})
+        return payload["tracks"]["items"]
+
+    async def get_tracks(self, track_ids):
+        """Fetch many tracks by ID, 50 per request, with the batches in parallel."""
+        batches = [track_ids[i:i + TRACKS_BATCH_SIZE] for i in range(0, len(track_ids), TRACKS_BATCH_SIZE)]
+        results = await asyncio.gather(*(
+            self._get("/tracks", {"ids": ",".join(batch)}) for batch in batches
+        ))
+        return [track for payload in results for track in payload["tracks"] if track]
+
+    async def iter_collection(self, kind, collection_id, max_tracks=None):
+        """Yield a playlist's or album's tracks page by page, as each page arrives.
+
+        Local files and removed tracks (no ID) are skipped.
+        """
+        path = f"/{kind}s/{collection_id}/tracks"
+        limit = PAGE_SIZES[kind]
+        offset = 0
+        yielded = 0
+        while True:
+            payload = await self._get(path, {"limit": limit, "offset": offset})
+            items = payload.get("items") or []
+            page = []
+            for item in items:
+                track = item.get("track") if kind == "playlist" else item
+                if track and track.get("id") and not track.get("is_local"):
+                    page.append(track)
+            if max_tracks is not None:
+                page = page[:max_tracks - yielded]
+            if page:
+                yielded += len(page)
+                yield page
+            offset += len(items)
+            if not payload.get("next") or not items or (max_tracks is not None and yielded >= max_tracks):
+                return
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
@@ -0,0 +1,138 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+
+import aiofiles
+
+logger = logging.getLogger(__name__)
+
+
+class HyperLogLog:
+    """Distinct-count sketch: 2**p one-byte registers, ~1.04/sqrt(2**p) error (1.6% at p=12)."""
+
+    def __init__(self, p=12, registers=None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(registers) if registers else bytearray(self.m)
+
+    def add(self, value):
+        x = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+        index = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def count(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # small-range correction
+        return int(round(estimate))
+
+    def dump(self):
+        return base64.b64encode(bytes(self.registers)).decode()
+
+    @classmethod
+    def load(cls, data, p=12):
+        return cls(p, base64.b64decode(data)) if data else cls(p)
+
+
+class BotStats:
+    """Incremental bot statistics; every update is O(1) and flushed to disk in batches."""
+
+    def __init__(self, path="stats.json", max_tracks=5000):
+        self.path = path
+        self.max_tracks = max_tracks
+        self.users = HyperLogLog()
+        self.groups = HyperLogLog()
+        self.plays_per_chat = {}
+        self.tracks = {}  # track key -> [plays, title]
+        self.total_plays = 0
+        self.started_at = time.time()
+        self._dirty = False
+
+    # ✅ Updates (called from handlers)
+    def seen(self, user_id=None, chat_id=None, is_group=False):
+        if user_id is not None and self.users.add(user_id):
+            self._dirty = True
+        if is_group and chat_id is not None and self.groups.add(chat_id):
+            self._dirty = True
+
+    def record_play(self, chat_id, track_key, title):
+        self.total_plays += 1
+        self.plays_per_chat[chat_id] = self.plays_per_chat.get(chat_id, 0) + 1
+        entry = self.tracks.get(track_key)
+        if entry is None:
+            if len(self.tracks) >= self.max_tracks:
+                self._trim_tracks()
+            entry = self.tracks[track_key] = [0, title]
+        entry[0] += 1
+        self._dirty = True
+
+    def _trim_tracks(self):
+        # Keep the most played half; amortised O(1) per insert
+        keep = sorted(self.tracks.items(), key=lambda kv: kv[1][0], reverse=True)[:self.max_tracks // 2]
+        self.tracks = dict(keep)
+
+    # ✅ Reads (owner panel)
+    def top_tracks(self, n=5):
+        return sorted(self.tracks.values(), key=lambda entry: entry[0], reverse=True)[:n]
+
+    def top_track_keys(self, n=20):
+        return [key for key, _ in sorted(self.tracks.items(), key=lambda kv: kv[1][0], reverse=True)[:n]]
+
+    def summary(self):
+        return {
+            "users": self.users.count(),
+            "groups": self.groups.count(),
+            "total_plays": self.total_plays,
+            "active_chats": len(self.plays_per_chat),
+        }
+
+    # ✅ Persistence
+    async def load(self):
+        try:
+            async with aiofiles.open(self.path, "r") as f:
+                data = json.loads(await f.read() or "{}")
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        self.users = HyperLogLog.load(data.get("users"))
+        self.groups = HyperLogLog.load(data.get("groups"))
+        self.plays_per_chat = {int(k): v for k, v in data.get("plays_per_chat", {}).items()}
+        self.tracks = data.get("tracks", {})
+        self.total_plays = data.get("total_plays", 0)
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        self._dirty = False
+        data = json.dumps({
+            "users": self.users.dump(),
+            "groups": self.groups.dump(),
+            "plays_per_chat": self.plays_per_chat,
+            "tracks": self.tracks,
+            "total_plays": self.total_plays,
+        })
+        tmp_path = f"{self.path}.tmp"
+        try:
+            async with aiofiles.open(tmp_path, "w") as f:
+                await f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self._dirty = True
+            logger.error(f"❌ Stats Save Error: {e}")
+
+    async def run_flusher(self, interval=60):
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
@@ -0,0 +1,331 @@
+import asyncio
+import bisect
+import hashlib
+import heapq
+import json
+import logging
+import os
+import re
+from array import array
+from operator import itemgetter
+
+logger = logging.getLogger(__name__)
+
+VIDEO_ID_BYTES = 11  # YouTube IDs are 11 ASCII characters
+RUN_SIZE = 1 << 18     # log entries sorted at a time on load; bounds the transient Python objects
+COMPACT_RATIO = 0.5    # rewrite the log on load once this share of its lines is superseded
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+
+
+def index_key(query):
+    """Case-fold, strip punctuation and collapse whitespace: "Tum Hi Ho!" == "tum  hi ho"."""
+    return " ".join(_PUNCTUATION.sub(" ", query.casefold()).split())
+
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "big")
+
+
+class _HashIndex:
+    """hash64 -> row: a frozen sorted base plus a dict of recent additions."""
+
+    def __init__(self):
+        self._keys = array("Q")
+        self._rows = array("I")
+        self._recent = {}
+
+    def __len__(self):
+        return len(self._keys) + len(self._recent)
+
+    def get(self, key):
+        row = self._recent.get(key)
+        if row is not None:
+            return row
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return self._rows[i]
+        return None
+
+    def __setitem__(self, key, row):
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            self._rows[i] = row
+        else:
+            self._recent[key] = row
+
+    def load(self, keys, rows):
+        """Replace everything with a sorted, duplicate-free base."""
+        self._keys, self._rows, self._recent = keys, rows, {}
+
+
+class _SortedRuns:
+    """``(hash64, line number, value)`` entries read from the log, sorted a run at a time.
+
+    Every ``RUN_SIZE`` entries are stable-sorted by hash into flat arrays;
+    ``merged()`` streams the runs back in hash order, with equal hashes in
+    log order, and keeps only the last entry of each.
+    """
+
+    def __init__(self, value_type):
+        self._value_type = value_type
+        self._runs = []
+        self._start_run()
+
+    def _start_run(self):
+        self._keys, self._lines, self._values = array("Q"), array("I"), array(self._value_type)
+
+    def add(self, key, line, value):
+        self._keys.append(key)
+        self._lines.append(line)
+        self._values.append(value)
+        if len(self._keys) >= RUN_SIZE:
+            self._seal()
+
+    def _seal(self):
+        if not self._keys:
+            return
+        order = sorted(range(len(self._keys)), key=self._keys.__getitem__)
+        self._runs.append(tuple(array(column.typecode, (column[i] for i in order))
+                                for column in (self._keys, self._lines, self._values)))
+        self._start_run()
+
+    def merged(self):
+        self._seal()
+        runs, self._runs = self._runs, []
+        last = None
+        # heapq.merge breaks ties by run order, and runs are in log order
+        for entry in heapq.merge(*(zip(*run) for run in runs), key=itemgetter(0)):
+            if last is not None and entry[0] != last[0]:
+                yield last
+            last = entry
+        if last is not None:
+            yield last
+
+
+class TrackIndex:
+    """Spotify track ID -> YouTube video, plus normalized query -> the same row.
+
+    Rows live in flat arrays (11-byte video IDs in one bytearray, durations
+    in an ``array``) and both indexes map a 64-bit hash of the key to a row
+    number. What was loaded from disk is kept in sorted ``array`` pairs (12
+    bytes per key, binary search), built from runs sorted while reading, so
+    loading never holds a dict of every key; only keys added since start
+    sit in a dict. Additions are appended to a JSON-lines log by a
+    background writer; the last line for a key wins on load, and the log
+    is rewritten without superseded lines once they are ``COMPACT_RATIO``
+    of it.
+    """
+
+    def __init__(self, path="track_index.jsonl", flush_interval=5):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._by_spotify = _HashIndex()  # hash64(spotify id) -> row
+        self._by_query = _HashIndex()    # hash64(index_key(query)) -> row
+        self._video_ids = bytearray()
+        self._durations = array("I")
+        self._titles = []
+        self._buffer = []
+        self._wakeup = asyncio.Event()
+        self._writer = None
+        self.stats = {"spotify_hits": 0, "spotify_misses": 0, "query_hits": 0, "query_misses": 0}
+
+    def __len__(self):
+        return len(self._titles)
+
+    # ✅ Rows
+    def _row(self, row):
+        start = row * VIDEO_ID_BYTES
+        return {
+            "id": self._video_ids[start:start + VIDEO_ID_BYTES].decode("ascii"),
+            "title": self._titles[row],
+            "duration": self._durations[row],
+        }
+
+    def _add_row(self, video_id, title, duration):
+        encoded = video_id.encode("ascii")
+        if len(encoded) != VIDEO_ID_BYTES:
+            return None
+        self._video_ids += encoded
+        self._durations.append(max(0, int(duration or 0)))
+        self._titles.append(title)
+        return len(self._titles) - 1
+
+    def _set_row(self, row, video_id, title, duration):
+        encoded = video_id.encode("ascii")
+        if len(encoded) != VIDEO_ID_BYTES:
+            return False
+        start = row * VIDEO_ID_BYTES
+        self._video_ids[start:start + VIDEO_ID_BYTES] = encoded
+        self._durations[row] = max(0, int(duration or 0))
+        self._titles[row] = title
+        return True
+
+    def _drop_rows_except(self, rows):
+        """Keep only the rows in ``rows`` (in their original order), renumbering ``rows`` in place."""
+        if len(rows) == len(self._titles):
+            return
+        keep = bytearray(len(self._titles))
+        for row in rows:
+            keep[row] = 1
+        renumber = array("I", [0]) * len(keep)
+        video_ids, durations, titles = bytearray(), array("I"), []
+        for row, kept in enumerate(keep):
+            if kept:
+                renumber[row] = len(titles)
+                start = row * VIDEO_ID_BYTES
+                video_ids += self._video_ids[start:start + VIDEO_ID_BYTES]
+                durations.append(self._durations[row])
+                titles.append(self._titles[row])
+        self._video_ids, self._durations, self._titles = video_ids, durations, titles
+        for i, row in enumerate(rows):
+            rows[i] = renumber[row]
+
+    # ✅ Lookups (memory only)
+    def by_spotify(self, spotify_id):
+        row = self._by_spotify.get(_hash64(spotify_id))
+        if row is None:
+            self.stats["spotify_misses"] += 1
+            return None
+        self.stats["spotify_hits"] += 1
+        return self._row(row)
+
+    def by_query(self, query):
+        row = self._by_query.get(_hash64(index_key(query)))
+        if row is None:
+            self.stats["query_misses"] += 1
+            return None
+        self.stats["query_hits"] += 1
+        return self._row(row)
+
+    def recent(self, n):
+        """The last ``n`` rows added, oldest first."""
+        for row in range(max(0, len(self._titles) - n), len(self._titles)):
+            yield self._row(row)
+
+    # ✅ Updates
+    def add(self, spotify_id, video, query=None):
+        """Remember that ``spotify_id`` plays as ``video`` (a yt-dlp info dict)."""
+        record = {"s": spotify_id, "v": video["id"], "t": video.get("title", ""), "d": video.get("duration") or 0}
+        key = _hash64(spotify_id)
+        row = self._by_spotify.get(key)
+        if row is None:
+            row = self._add_row(record["v"], record["t"], record["d"])
+            if row is None:
+                return
+            self._by_spotify[key] = row
+            self._log(record)
+        elif self._row(row)["id"] != video["id"]:
+            # Rematched: update the row in place, so its aliases follow
+            if not self._set_row(row, record["v"], record["t"], record["d"]):
+                return
+            self._log(record)
+        if query:
+            self.add_alias(query, spotify_id)
+
+    def add_alias(self, query, spotify_id):
+        key = index_key(query)
+        row = self._by_spotify.get(_hash64(spotify_id))
+        if not key or row is None or self._by_query.get(_hash64(key)) == row:
+            return
+        self._by_query[_hash64(key)] = row
+        self._log({"q": key, "s": spotify_id})
+
+    def _log(self, record):
+        self._buffer.append(json.dumps(record, ensure_ascii=False) + "\n")
+        self._wakeup.set()
+
+    # ✅ Persistence
+    def _read(self):
+        """Rebuild the index from the log; returns a 0/1 flag per log line, 1 if it is still in effect."""
+        tracks = _SortedRuns("I")   # hash64(spotify id) -> row
+        aliases = _SortedRuns("Q")  # hash64(query) -> hash64(spotify id)
+        lines = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line_no, line in enumerate(f):
+                    lines = line_no + 1
+                    try:
+                        record = json.loads(line)
+                        if "v" in record:
+                            row = self._add_row(record["v"], record.get("t", ""), record.get("d", 0))
+                            if row is not None:
+                                tracks.add(_hash64(record["s"]), line_no, row)
+                        elif "q" in record:
+                            aliases.add(_hash64(record["q"]), line_no, _hash64(record["s"]))
+                    except (json.JSONDecodeError, KeyError):
+                        continue  # torn tail write
+        except FileNotFoundError:
+            pass
+
+        live = bytearray(lines)
+        keys, rows = array("Q"), array("I")
+        for key, line_no, row in tracks.merged():
+            keys.append(key)
+            rows.append(row)
+            live[line_no] = 1
+        # Rows of a Spotify ID that was matched again later are dead weight
+        self._drop_rows_except(rows)
+        self._by_spotify.load(keys, rows)
+
+        keys, rows = array("Q"), array("I")
+        for key, line_no, spotify_key in aliases.merged():
+            row = self._by_spotify.get(spotify_key)
+            if row is not None:
+                keys.append(key)
+                rows.append(row)
+                live[line_no] = 1
+        self._by_query.load(keys, rows)
+        return live
+
+    def _compact(self, live):
+        """Rewrite the log with only the lines still in effect."""
+        tmp_path = f"{self.path}.tmp"
+        with open(self.path, "r", encoding="utf-8") as src, open(tmp_path, "w", encoding="utf-8") as dst:
+            for line_no, line in enumerate(src):
+                if line_no < len(live) and live[line_no]:
+                    dst.write(line if line.endswith("\n") else f"{line}\n")
+        os.replace(tmp_path, self.path)
+
+    async def load(self):
+        # Millions of lines: parse in a thread instead of line-by-line through aiofiles
+        loop = asyncio.get_running_loop()
+        live = await loop.run_in_executor(None, self._read)
+        logger.info(f"✅ Track index loaded: {len(self._by_spotify)} tracks, {len(self._by_query)} queries")
+        superseded = live.count(0)
+        if superseded and superseded >= len(live) * COMPACT_RATIO:
+            try:
+                await loop.run_in_executor(None, self._compact, live)
+                logger.info(f"✅ Track index log compacted: {len(live)} -> {len(live) - superseded} lines")
+            except OSError as e:
+                logger.error(f"❌ Track Index Compact Error: {e}")
+
+    def _append(self, lines):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._append, lines)
+        except OSError as e:
+            self._buffer[:0] = lines
+            logger.error(f"❌ Track Index Write Error: {e}")
+
+    async def _run_writer(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await asyncio.sleep(self.flush_interval)  # batch whatever arrives meanwhile
+            await self.flush()
+
+    def start(self):
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._run_writer())
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
+        await self.flush()
@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+
+import aiofiles
+
+logger = logging.getLogger(__name__)
+
+
+class TrackStore:
+    """Local Opus copies of frequently played tracks, kept within a byte budget.
+
+    Once a source has been played ``threshold`` times a background job pulls
+    it through ffmpeg once and stores a 48 kHz stereo Opus file, the format
+    the call ends up sending. Later plays read that file instead of
+    re-downloading and re-decoding the remote stream. Files are evicted in
+    LRU order when the store grows past ``max_bytes``; a file larger than
+    the whole budget is not kept at all.
+    """
+
+    def __init__(self, resolver, directory="tracks", max_bytes=2 * 1024 ** 3, threshold=3,
+                 max_jobs=2, bitrate="128k", ffmpeg="ffmpeg", max_counts=100000):
+        self.resolver = resolver
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.threshold = threshold
+        self.bitrate = bitrate
+        self.ffmpeg = ffmpeg
+        self.max_counts = max_counts
+        self.index_path = os.path.join(directory, "index.json")
+        self._index = {}  # key -> {"file", "size", "last_used", "hits"}
+        self._counts = {}
+        self._jobs = {}
+        self._too_large = set()  # keys whose file alone exceeded max_bytes
+        self._job_slots = asyncio.Semaphore(max_jobs)
+        self.total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _key(source):
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+    # ✅ Index
+    async def load(self):
+        try:
+            async with aiofiles.open(self.index_path, "r") as f:
+                data = await f.read()
+            index = json.loads(data) if data else {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            index = {}
+        # Drop entries whose file went missing
+        self._index = {k: v for k, v in index.items() if os.path.exists(os.path.join(self.directory, v["file"]))}
+        self.total_bytes = sum(v["size"] for v in self._index.values())
+        logger.info(f"✅ Track store: {len(self._index)} tracks, {self.total_bytes // (1024 * 1024)} MB")
+
+    async def _save_index(self):
+        tmp_path = f"{self.index_path}.tmp"
+        try:
+            async with aiofiles.open(tmp_path, "w") as f:
+                await f.write(json.dumps(self._index))
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.error(f"❌ Track Index Save Error: {e}")
+
+    # ✅ Lookups
+    def has(self, source):
+        """Whether a local copy exists; unlike ``local_path`` it does not count as a use."""
+        return self._key(source) in self._index
+
+    def local_path(self, source):
+        """Path of the local copy for a track about to play, updating its LRU position."""
+        entry = self._index.get(self._key(source))
+        if entry is None:
+            return None
+        entry["last_used"] = time.time()
+        entry["hits"] += 1
+        return os.path.join(self.directory, entry["file"])
+
+    def record_play(self, source):
+        key = self._key(source)
+        if key in self._index or key in self._jobs or key in self._too_large:
+            return
+        if len(self._counts) >= self.max_counts:
+            # Forget one-off plays first; they are the bulk of the table
+            self._counts = {k: c for k, c in self._counts.items() if c > 1}
+        count = self._counts[key] = self._counts.get(key, 0) + 1
+        if count >= self.threshold:
+            self._jobs[key] = asyncio.ensure_future(self._store(key, source))
+
+    # ✅ Background Transcoding
+    async def _store(self, key, source):
+        file_name = f"{key}.ogg"
+        path = os.path.join(self.directory, file_name)
+        tmp_path = f"{path}.part"
+        try:
+            async with self._job_slots:
+                stream_url = await self.resolver.resolve(source)
+                if not stream_url:
+                    return
+                process = await asyncio.create_subprocess_exec(
+                    self.ffmpeg, "-y", "-loglevel", "error", "-i", stream_url,
+                    "-vn", "-ac", "2", "-ar", "48000", "-c:a", "libopus", "-b:a", self.bitrate,
+                    "-f", "ogg", tmp_path,
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.PIPE
+                )
+                _, stderr = await process.communicate()
+                if process.returncode != 0:
+                    logger.warning(f"⚠️ Transcode failed for {source}: {stderr.decode(errors='ignore')[-300:]}")
+                    return
+            size = os.path.getsize(tmp_path)
+            if size > self.max_bytes:
+                # Storing it would only evict everything else, then itself
+                logger.warning(f"⚠️ Not storing {source}: {size} bytes exceeds the {self.max_bytes} byte budget")
+                self._too_large.add(key)
+                self._counts.pop(key, None)
+                return
+            os.replace(tmp_path, path)
+            self._index[key] = {"file": file_name, "size": size, "last_used": time.time(), "hits": 0}
+            self._counts.pop(key, None)
+            self.total_bytes += size
+            self._evict()
+            await self._save_index()
+        except Exception as e:
+            logger.error(f"❌ Track Store Error for {source}: {e}")
+        finally:
+            self._jobs.pop(key, None)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        for key, entry in sorted(self._index.items(), key=lambda kv: kv[1]["last_used"]):
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, entry["file"]))
+            except FileNotFoundError:
+                pass
+            self.total_bytes -= entry["size"]
+            del self._index[key]
+
+    def snapshot(self):
+        return {"tracks": len(self._index), "bytes": self.total_bytes, "jobs": len(self._jobs)}